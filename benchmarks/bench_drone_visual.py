@@ -0,0 +1,106 @@
+"""Compare the stencil based drone visual against the original BFS scan.
+
+Usage: python benchmarks/bench_drone_visual.py [--radii 5 40 150] [--repeats 20]
+"""
+import argparse
+import math
+import os
+import sys
+import time
+from collections import deque as queue
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import constants
+from drone_visibility import drone_visual
+from door_clock import pack_doors
+
+dRow = [-1, 0, 1, 0]
+dCol = [0, -1, 0, 1]
+
+
+def door_distance(cur_pos, row, col, door_type):
+    # Three point rule of the original TimingMazeGame.validate_distance_between_drone_and_door
+    drone_x, drone_y = cur_pos[0] + 0.5, cur_pos[1] + 0.5
+    if door_type == constants.LEFT:
+        points = ((row, col + 0.5), (row, col + 1), (row, col))
+    elif door_type == constants.RIGHT:
+        points = ((row + 1, col + 0.5), (row + 1, col + 1), (row + 1, col))
+    elif door_type == constants.UP:
+        points = ((row + 0.5, col), (row, col), (row + 1, col))
+    else:
+        points = ((row + 0.5, col + 1), (row, col + 1), (row + 1, col + 1))
+    return min(math.sqrt((drone_x - x) ** 2 + (drone_y - y) ** 2) for x, y in points)
+
+
+def bfs_drone_visual(is_open, cur_pos, end_pos, radius):
+    # The original TimingMazeGame.BFS scan
+    map_dim = is_open.shape[0]
+    state = []
+    q = queue()
+    vis = [[False for _ in range(map_dim)] for _ in range(map_dim)]
+    q.append((cur_pos[0], cur_pos[1]))
+    vis[cur_pos[0]][cur_pos[1]] = True
+    is_end_visible = cur_pos[0] == end_pos[0] and cur_pos[1] == end_pos[1]
+    while len(q) > 0:
+        row, col = q.popleft()
+        any_part_visible = False
+        for door_type in range(4):
+            if door_distance(cur_pos, row, col, door_type) > radius:
+                continue
+            any_part_visible = True
+            if ((row == 0 and door_type == constants.UP) or (row == map_dim - 1 and door_type == constants.DOWN)
+                    or (col == 0 and door_type == constants.LEFT)
+                    or (col == map_dim - 1 and door_type == constants.RIGHT)):
+                door_state = constants.BOUNDARY
+            elif is_open[row][col][door_type]:
+                door_state = constants.OPEN
+            else:
+                door_state = constants.CLOSED
+            state.append((row - cur_pos[0], col - cur_pos[1], door_type, door_state))
+        if not any_part_visible:
+            continue
+        if row == end_pos[0] and col == end_pos[1]:
+            is_end_visible = True
+        for i in range(4):
+            adj_x, adj_y = row + dRow[i], col + dCol[i]
+            if 0 <= adj_x < map_dim and 0 <= adj_y < map_dim and not vis[adj_x][adj_y]:
+                q.append((adj_x, adj_y))
+                vis[adj_x][adj_y] = True
+    return state, is_end_visible
+
+
+def time_call(fn, positions, *args):
+    start = time.perf_counter()
+    for pos, end in positions:
+        fn(*args[:1], pos, end, *args[1:])
+    return (time.perf_counter() - start) / len(positions)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--radii", type=int, nargs="+", default=[5, 40, 150])
+    parser.add_argument("--repeats", type=int, default=20, help="Number of random drone positions per radius")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    is_open = rng.random((constants.map_dim, constants.map_dim, 4)) < 0.3
+    open_bits = pack_doors(is_open)
+    positions = [(rng.integers(0, constants.map_dim, 2), rng.integers(0, constants.map_dim, 2))
+                 for _ in range(args.repeats)]
+
+    print("{:>6} {:>12} {:>12} {:>9}".format("radius", "bfs (ms)", "stencil (ms)", "speedup"))
+    for radius in args.radii:
+        for pos, end in positions:
+            bfs_state, bfs_end = bfs_drone_visual(is_open, pos, end, radius)
+            state, is_end_visible = drone_visual(open_bits, pos, end, radius)
+            assert sorted(bfs_state) == sorted(map(tuple, state.tolist())) and bfs_end == is_end_visible, \
+                "percept mismatch"
+        drone_visual(open_bits, positions[0][0], positions[0][1], radius)  # build the cached stencil
+        bfs_time = time_call(bfs_drone_visual, positions, is_open, radius)
+        stencil_time = time_call(drone_visual, positions, open_bits, radius)
+        print("{:>6} {:>12.3f} {:>12.3f} {:>8.1f}x".format(radius, bfs_time * 1e3, stencil_time * 1e3,
+                                                          bfs_time / stencil_time))
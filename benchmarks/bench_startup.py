@@ -0,0 +1,101 @@
+"""Measure the startup cost of the headless engine against the engine of a baseline revision, which loaded tkinter.
+
+Every sample runs in a fresh interpreter, so imports are not cached between samples. The samples also check that the
+engine does not load tkinter or the modules of the options that are off when headless, and that loading a player
+imports that player's module only. The baseline, the first commit of the repository by default, is extracted with git
+archive into a temporary directory, and the script exits with an error when the headless engine or simulation starts
+slower than the baseline by more than the tolerance.
+
+Usage: python benchmarks/bench_startup.py [--repeats 10] [--baseline REV] [--tolerance 0.05]
+"""
+import argparse
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOAD_PLAYER = "import player_registry; player_registry.load_player(player_registry.find_player({!r})[1])"
+# Modules of the options a headless game does not use by default, the engine imports them when the option is given
+OPTIONAL = ("player_host", "multiprocessing", "game_profiler", "cProfile", "player_watchdog",
+            "player_registry", "importlib.metadata", "replay_log", "map_cache", "tempfile")
+# Each snippet prints the seconds spent between the interpreter being up and the engine being ready, next to the
+# modules it must not have loaded
+SNIPPETS = {
+    "headless engine": ("import timing_maze_game",
+                        ("tkinter", "players.default_player", "players.g1_player") + OPTIONAL),
+    "headless simulation": ("import timing_maze_game_simulation, simulation",
+                            ("tkinter", "players.g1_player", "player_host", "game_profiler", "player_watchdog")),
+    "engine + tkinter": ("import timing_maze_game, tkinter", ()),
+    "engine + player d": ("import timing_maze_game; " + LOAD_PLAYER.format("d"), ("tkinter", "players.g1_player")),
+    "engine + player 1": ("import timing_maze_game; " + LOAD_PLAYER.format("1"), ("tkinter", "players.default_player")),
+}
+# Cases compared with the same imports in the baseline
+BASELINE_SNIPPETS = {
+    "headless engine": "import timing_maze_game",
+    "headless simulation": "import timing_maze_game_simulation, simulation",
+}
+TEMPLATE = """import sys, time
+start = time.perf_counter()
+{snippet}
+elapsed = time.perf_counter() - start
+loaded = [module for module in {unexpected!r} if module in sys.modules]
+assert not loaded, "the engine loaded {{}}".format(loaded)
+print(elapsed)
+"""
+
+
+def sample(snippet, unexpected, cwd=REPO):
+    code = TEMPLATE.format(snippet=snippet, unexpected=unexpected)
+    output = subprocess.run([sys.executable, "-c", code], cwd=cwd, check=True, capture_output=True, text=True)
+    return float(output.stdout)
+
+
+def extract_baseline(revision, directory):
+    """Extract the tree of a revision of the repository into directory, the first commit if revision is None"""
+    if revision is None:
+        roots = subprocess.run(["git", "rev-list", "--max-parents=0", "HEAD"], cwd=REPO, check=True,
+                               capture_output=True, text=True).stdout.split()
+        revision = roots[-1]
+    archive = subprocess.run(["git", "archive", revision], cwd=REPO, check=True, capture_output=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(directory)
+    return revision
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=10, help="Number of fresh interpreters per case")
+    parser.add_argument("--baseline", help="Revision to compare with, the first commit by default")
+    parser.add_argument("--tolerance", type=float, default=0.05,
+                        help="Fraction by which a case may start slower than the baseline before failing")
+    args = parser.parse_args()
+
+    print("{:>20} {:>12} {:>12}".format("case", "median (ms)", "min (ms)"))
+    for name, (snippet, unexpected) in SNIPPETS.items():
+        times = [sample(snippet, unexpected) for _ in range(args.repeats)]
+        print("{:>20} {:>12.1f} {:>12.1f}".format(name, statistics.median(times) * 1e3, min(times) * 1e3))
+
+    regressions = []
+    with tempfile.TemporaryDirectory(prefix="timing_maze_baseline_") as baseline_dir:
+        revision = extract_baseline(args.baseline, baseline_dir)
+        print("\nBaseline {}".format(revision[:12]))
+        print("{:>20} {:>12} {:>12} {:>8}".format("case", "median (ms)", "now (ms)", "ratio"))
+        for name, snippet in BASELINE_SNIPPETS.items():
+            # Both trees are sampled in turn, so a change in the load of the machine affects both alike
+            now, baseline = [], []
+            for _ in range(args.repeats):
+                now.append(sample(SNIPPETS[name][0], SNIPPETS[name][1]))
+                baseline.append(sample(snippet, (), baseline_dir))
+            ratio = statistics.median(now) / statistics.median(baseline)
+            print("{:>20} {:>12.1f} {:>12.1f} {:>8.2f}".format(name, statistics.median(baseline) * 1e3,
+                                                              statistics.median(now) * 1e3, ratio))
+            if ratio > 1 + args.tolerance:
+                regressions.append(name)
+
+    if regressions:
+        sys.exit("Slower to start than the baseline: {}".format(", ".join(regressions)))
@@ -8,6 +8,9 @@ CLOSED_PROB = 0.05
 
 possible_players = ["d"] + list(map(str, range(1, 10)))
 
+# Profilers of --profile, see game_profiler.py
+profilers = ("cprofile", "sampling")
+
 # Directions for the maze
 WAIT = -1
 LEFT = 0
@@ -16,6 +19,7 @@ RIGHT = 2
 DOWN = 3
 
 # Maze cell states
+UNKNOWN = 0
 CLOSED = 1
 OPEN = 2
 BOUNDARY = 3
@@ -0,0 +1,172 @@
+import math
+import numpy as np
+import constants
+
+FREQUENCY_DTYPE = np.uint8
+
+
+def compact_frequencies(frequencies):
+    """Return dense frequencies as uint8, which holds any valid door frequency, leaving other maps as they are"""
+    if isinstance(frequencies, np.ndarray) and frequencies.dtype != FREQUENCY_DTYPE and frequencies.size:
+        limits = np.iinfo(FREQUENCY_DTYPE)
+        if limits.min <= frequencies.min() and frequencies.max() <= limits.max:
+            return np.ascontiguousarray(frequencies, dtype=FREQUENCY_DTYPE)
+    return frequencies
+
+
+def pack_doors(is_open):
+    """Pack a boolean (..., 4) array of doors into a uint8 (...) array with bit door_type set for every open door"""
+    # Read the four doors of a cell as one little-endian uint32 holding a 0 or 1 in each byte, the multiply moves
+    # byte door_type to bit 24 + door_type without any of the partial products overlapping
+    words = np.ascontiguousarray(is_open, dtype=bool).view("<u4")[..., 0]
+    return ((words * np.uint32(0x01020408)) >> np.uint32(24)).astype(np.uint8)
+
+
+class DoorClock:
+    """Closed-form door schedule for a maze.
+
+    A door with frequency n is open exactly on the turns that are multiples of n, and a door with
+    frequency 0 is never open. The state of every door is therefore a pure function of the turn number
+    and the frequency map, so nothing needs to be updated between turns.
+
+    Open doors are reported packed, one uint8 per cell with bit door_type set when that door is open, so
+    the four doors of a cell are read with a single load.
+
+    Turns are numbered from 1, matching TimingMazeGame.turns during play_game.
+    """
+
+    def __init__(self, frequencies):
+        """
+            Args:
+                frequencies (Union[np.ndarray, TiledMap]): (width, height, 4) array of door frequencies, dense
+                    arrays are stored as uint8
+        """
+        self.frequencies = compact_frequencies(frequencies)
+        self.max_frequency = int(frequencies.max()) if frequencies.size else 0
+        self._periods = np.arange(1, self.max_frequency + 1)
+        self._bits_turn = None
+        self._bits_bounds = None
+        self._bits = None
+
+    def open_table(self, turn):
+        """Return a lookup table indexed by frequency, True for frequencies whose doors are open on turn"""
+        table = np.zeros(self.max_frequency + 1, dtype=bool)
+        table[1:] = turn % self._periods == 0
+        return table
+
+    def open_bits(self, turn, x0=0, x1=None, y0=0, y1=None):
+        """Return the open doors of the cells [x0, x1) x [y0, y1) on turn, of the whole maze by default
+
+        The result is a uint8 (x1 - x0, y1 - y0) array with bit door_type set for every open door, and only the
+        frequencies of the region are read, which is all a tiled map keeps in memory. The last result is cached,
+        since the drone and the move check both read the doors around the drone every turn. Callers must not
+        modify the returned array.
+        """
+        width, height = self.frequencies.shape[:2]
+        bounds = (x0, width if x1 is None else x1, y0, height if y1 is None else y1)
+        if self._bits_turn != turn or self._bits_bounds != bounds:
+            frequencies = self.frequencies[bounds[0]:bounds[1], bounds[2]:bounds[3]]
+            bits = pack_doors(self.open_table(turn)[frequencies])
+            self._bits, self._bits_turn, self._bits_bounds = bits, turn, bounds
+        return self._bits
+
+    def is_open(self, row, col, door_type, turn):
+        """Return True if the given door is open on the given turn"""
+        # Read the packed doors of the last region when they cover the cell
+        if self._bits_turn == turn:
+            x0, x1, y0, y1 = self._bits_bounds
+            if x0 <= row < x1 and y0 <= col < y1:
+                return bool(self._bits[row - x0, col - y0] >> door_type & 1)
+        frequency = int(self.frequencies[row, col, door_type])
+        return frequency > 0 and turn % frequency == 0
+
+    def state(self, turn):
+        """Return the per-door countdown on the given turn, as previously stored in map_state
+
+        A door is open when its countdown is 1, doors with frequency 0 stay at 0.
+        """
+        frequencies = self.frequencies[:, :].astype(int)
+        periods = np.maximum(frequencies, 1)
+        return np.where(frequencies > 0, frequencies - (turn - 1) % periods, 0)
+
+
+class EdgeSchedule:
+    """Turns on which each edge between two neighbouring cells can be crossed.
+
+    A move succeeds only when the doors on both sides of the edge are open. With frequencies n1 and n2 they are open
+    together exactly on the multiples of lcm(n1, n2), so every edge repeats with its own period, at most the period
+    lcm(1..L) of the whole maze, and its phase is zero since every door opens on the multiples of its frequency.
+    Storing one period per edge is therefore enough to answer "when can I next cross" in O(1), instead of
+    storing the timelines of the maze over a whole period. A period of 0 means the edge can never be crossed.
+
+    The periods are built in one pass over the frequencies, for dense maps only. The periods of a tiled map are
+    computed from the two doors of an edge when asked for, so only the tiles around the queried cells are read.
+
+    The schedule depends on nothing but the frequencies, so players can build one from their own estimates of the
+    frequencies as a planning aid.
+    """
+
+    def __init__(self, frequencies):
+        """
+            Args:
+                frequencies (Union[np.ndarray, TiledMap]): (width, height, 4) array of door frequencies
+        """
+        self.frequencies = frequencies
+        self.dims = tuple(frequencies.shape[:2])
+        self._maze_period = None
+        if isinstance(frequencies, np.ndarray):
+            # lcm(n1, n2) <= n1 * n2 fits in uint16 for uint8 frequencies
+            dtype = np.uint16 if frequencies.size == 0 or frequencies.max() <= 255 else np.int64
+            frequencies = frequencies.astype(dtype)
+            # period_x[x, y] is the edge between (x, y) and (x + 1, y), period_y[x, y] between (x, y) and (x, y + 1)
+            self.period_x = np.lcm(frequencies[:-1, :, constants.RIGHT], frequencies[1:, :, constants.LEFT])
+            self.period_y = np.lcm(frequencies[:, :-1, constants.DOWN], frequencies[:, 1:, constants.UP])
+        else:
+            self.period_x = self.period_y = None
+
+    def period(self, x, y, move):
+        """Return the period of the edge crossed by move from cell (x, y), 0 if it can never be crossed"""
+        width, height = self.dims
+        if move == constants.LEFT:
+            x, y, horizontal = x - 1, y, True
+        elif move == constants.UP:
+            x, y, horizontal = x, y - 1, False
+        elif move == constants.RIGHT:
+            horizontal = True
+        elif move == constants.DOWN:
+            horizontal = False
+        else:
+            raise ValueError("Move {} does not cross an edge".format(move))
+        if x < 0 or y < 0 or (horizontal and x >= width - 1) or (not horizontal and y >= height - 1):
+            return 0
+        if self.period_x is not None:
+            return int(self.period_x[x, y] if horizontal else self.period_y[x, y])
+        if horizontal:
+            doors = (self.frequencies[x, y, constants.RIGHT], self.frequencies[x + 1, y, constants.LEFT])
+        else:
+            doors = (self.frequencies[x, y, constants.DOWN], self.frequencies[x, y + 1, constants.UP])
+        return math.lcm(int(doors[0]), int(doors[1]))
+
+    def next_crossable(self, x, y, move, turn):
+        """Return the first turn from turn on, turn included, on which move can be made from cell (x, y)
+
+        Returns None if the edge can never be crossed. WAIT can be made on any turn.
+        """
+        if move == constants.WAIT:
+            return turn
+        period = self.period(x, y, move)
+        if period == 0:
+            return None
+        return -(-turn // period) * period
+
+    @property
+    def maze_period(self):
+        """The number of turns after which every door of the maze is back in the same state"""
+        if self._maze_period is None:
+            if isinstance(self.frequencies, np.ndarray):
+                frequencies = np.unique(self.frequencies)
+            else:
+                frequencies = np.unique(np.concatenate([np.unique(tile)
+                                                        for _, _, tile in self.frequencies.iter_tiles()]))
+            self._maze_period = math.lcm(*(int(n) for n in frequencies if n > 0))
+        return self._maze_period
@@ -0,0 +1,89 @@
+from functools import lru_cache
+import numpy as np
+import constants
+
+# Offsets of the three points (both ends and the centre) of each door from the top left corner of its cell,
+# indexed by door type
+DOOR_POINTS = {
+    constants.LEFT: ((0, 0.5), (0, 1), (0, 0)),
+    constants.UP: ((0.5, 0), (0, 0), (1, 0)),
+    constants.RIGHT: ((1, 0.5), (1, 1), (1, 0)),
+    constants.DOWN: ((0.5, 1), (0, 1), (1, 1)),
+}
+
+
+@lru_cache(maxsize=None)
+def visibility_stencil(radius):
+    """Return the doors visible from a drone at the centre of a cell, as a boolean (2r+1, 2r+1, 4) array
+
+    Entry [dx + r][dy + r][door_type] is True if any of the three points of that door of the cell at offset
+    (dx, dy) lies within radius of the centre of the drone's cell. The stencil only depends on the radius, so
+    it is computed once and cached; the returned array must not be modified.
+    """
+    offsets = np.arange(-radius, radius + 1, dtype=float)
+    dx = offsets[:, None]
+    dy = offsets[None, :]
+    stencil = np.zeros((offsets.size, offsets.size, 4), dtype=bool)
+    for door_type, points in DOOR_POINTS.items():
+        distance = None
+        for px, py in points:
+            # the drone sits at (0.5, 0.5) relative to the top left corner of its own cell
+            point_distance = np.sqrt((dx + px - 0.5) ** 2 + (dy + py - 0.5) ** 2)
+            distance = point_distance if distance is None else np.minimum(distance, point_distance)
+        stencil[:, :, door_type] = distance <= radius
+    stencil.setflags(write=False)
+    return stencil
+
+
+def visible_window(cur_pos, dims, radius):
+    """Return the cells (x0, x1, y0, y1) of the square around the drone its view can reach, clipped to the maze"""
+    width, height = dims
+    cur_x, cur_y = int(cur_pos[0]), int(cur_pos[1])
+    return (max(cur_x - radius, 0), min(cur_x + radius + 1, width),
+            max(cur_y - radius, 0), min(cur_y + radius + 1, height))
+
+
+def drone_visual(open_bits, cur_pos, end_pos, radius, origin=(0, 0), dims=None):
+    """Gather the doors visible from the drone
+
+        Args:
+            open_bits (np.ndarray): uint8 array of the doors open on this turn packed as in DoorClock.open_bits,
+                either (width, height) for the whole maze or a region starting at origin that covers the
+                visible_window of the drone
+            cur_pos (np.ndarray): position of the drone
+            end_pos (np.ndarray): position of the end cell
+            radius (int): radius of the drone
+            origin (Tuple[int, int]): cell of the maze at open_bits[0, 0]
+            dims (Tuple[int, int]): (width, height) of the maze, the shape of open_bits if not given
+        Returns:
+            Tuple[np.ndarray, bool]: the visible doors as an int16 (n, 4) array of rows (dx, dy, door_type,
+                door_state) relative to the drone, and whether the end cell is visible
+    """
+    width, height = dims if dims is not None else open_bits.shape[:2]
+    cur_x, cur_y = int(cur_pos[0]), int(cur_pos[1])
+    stencil = visibility_stencil(radius)
+
+    # Clip the stencil against the map edges
+    x0, x1, y0, y1 = visible_window(cur_pos, (width, height), radius)
+    visible = stencil[x0 - cur_x + radius:x1 - cur_x + radius, y0 - cur_y + radius:y1 - cur_y + radius]
+    origin_x, origin_y = origin
+
+    xs, ys, door_types = np.nonzero(visible)
+    xs += x0
+    ys += y0
+    door_states = np.where(open_bits[xs - origin_x, ys - origin_y] >> door_types.astype(np.uint8) & 1,
+                           constants.OPEN, constants.CLOSED)
+    door_states[((xs == 0) & (door_types == constants.UP))
+                | ((xs == width - 1) & (door_types == constants.DOWN))
+                | ((ys == 0) & (door_types == constants.LEFT))
+                | ((ys == height - 1) & (door_types == constants.RIGHT))] = constants.BOUNDARY
+
+    end_x, end_y = int(end_pos[0]), int(end_pos[1])
+    is_end_visible = bool(x0 <= end_x < x1 and y0 <= end_y < y1 and visible[end_x - x0, end_y - y0].any())
+
+    state = np.empty((xs.size, 4), dtype=np.int16)
+    state[:, 0] = xs - cur_x
+    state[:, 1] = ys - cur_y
+    state[:, 2] = door_types
+    state[:, 3] = door_states
+    return state, is_end_visible
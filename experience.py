@@ -38,7 +38,10 @@ class Experience:
             0,
             0,
         )  # (x, y) coordinates relative to the original start position
-        self.maze_dimension = 100  # size of the maze
+        self.maze_width, self.maze_height = (
+            constants.map_dim,
+            constants.map_dim,
+        )  # size of the maze along x and y, updated from the percept
         self.seen_cells = (
             set()
         )  # set of tuples (x, y) storing coordinates of cells relative to the original start position
@@ -62,6 +65,7 @@ class Experience:
         """
 
         self.cur_pos = (-current_percept.start_x, -current_percept.start_y)
+        self.maze_width, self.maze_height = current_percept.map_dims
         self.stays[self.cur_pos] = self.stays.get(self.cur_pos, 0) + 1
         self.num_turns += 1
         self.direction_vector_weight = min(
@@ -69,25 +73,27 @@ class Experience:
             self.direction_vector_multiplier * self.num_turns,
         )  # update direction vector weight
 
-        # initialize coordinates for the maximum field of view relative to current position
-        right, top, left, bottom = 0, 0, 0, 0
+        # maze_state is an int16 (n, 4) array of (dx, dy, door_type, door_state) rows
+        maze_state = current_percept.maze_state
 
-        for cell in current_percept.maze_state:
-
-            # update field of view coordinates relative to current position
-            right, top, left, bottom = (
-                max(right, cell[0]),
-                max(top, cell[1]),
-                min(left, cell[0]),
-                min(bottom, cell[1]),
-            )
+        # field of view coordinates relative to current position
+        right, top, left, bottom = (
+            max(0, int(maze_state[:, 0].max(initial=0))),
+            max(0, int(maze_state[:, 1].max(initial=0))),
+            min(0, int(maze_state[:, 0].min(initial=0))),
+            min(0, int(maze_state[:, 1].min(initial=0))),
+        )
 
-            cell = (
-                self.cur_pos[0] + cell[0],
-                self.cur_pos[1] + cell[1],
+        # one row per visible door: cells at the edge of the drone's view only have the
+        # doors facing the drone listed. A cell counts as seen as soon as one of its
+        # doors is, so the rows are reduced to their distinct cells
+        cells = np.unique(maze_state[:, :2], axis=0)
+        self.seen_cells.update(
+            zip(
+                (cells[:, 0] + self.cur_pos[0]).tolist(),
+                (cells[:, 1] + self.cur_pos[1]).tolist(),
             )
-            if cell not in self.seen_cells:
-                self.seen_cells.add(cell)
+        )
 
         # update walls coordinates relative to the original start position
         # TODO: infer left wall from right wall, and bottom wall from top wall
@@ -95,7 +101,7 @@ class Experience:
             self.walls = (
                 right + self.cur_pos[0],
                 self.walls[1],
-                right + self.cur_pos[0] - self.maze_dimension,
+                right + self.cur_pos[0] - self.maze_width,
                 self.walls[3],
             )
         if top < self.r:
@@ -103,11 +109,11 @@ class Experience:
                 self.walls[0],
                 top + self.cur_pos[1],
                 self.walls[2],
-                top + self.cur_pos[1] - self.maze_dimension,
+                top + self.cur_pos[1] - self.maze_height,
             )
         if left > -self.r:
             self.walls = (
-                left + self.cur_pos[0] + self.maze_dimension,
+                left + self.cur_pos[0] + self.maze_width,
                 self.walls[1],
                 left + self.cur_pos[0],
                 self.walls[3],
@@ -115,7 +121,7 @@ class Experience:
         if bottom > -self.r:
             self.walls = (
                 self.walls[0],
-                bottom + self.cur_pos[1] + self.maze_dimension,
+                bottom + self.cur_pos[1] + self.maze_height,
                 self.walls[2],
                 bottom + self.cur_pos[1],
             )
@@ -295,51 +301,6 @@ class Experience:
                         num_new_cells += 1
         return num_new_cells
 
-    # TODO: This function can be sped up by decreasing the number iterations
     def is_valid_move(self, current_percept, move):
-        direction = [0, 0, 0, 0]
-        for maze_state in current_percept.maze_state:
-            if maze_state[0] == 0 and maze_state[1] == 0:
-                direction[maze_state[2]] = maze_state[3]
-
-        if direction[move] != constants.OPEN:
-            return False
-
-        if move == constants.LEFT:
-            for maze_state in current_percept.maze_state:
-                if (
-                    maze_state[0] == -1
-                    and maze_state[1] == 0
-                    and maze_state[2] == constants.RIGHT
-                    and maze_state[3] == constants.OPEN
-                ):
-                    return True
-        elif move == constants.UP:
-            for maze_state in current_percept.maze_state:
-                if (
-                    maze_state[0] == 0
-                    and maze_state[1] == -1
-                    and maze_state[2] == constants.DOWN
-                    and maze_state[3] == constants.OPEN
-                ):
-                    return True
-        elif move == constants.RIGHT:
-            for maze_state in current_percept.maze_state:
-                if (
-                    maze_state[0] == 1
-                    and maze_state[1] == 0
-                    and maze_state[2] == constants.LEFT
-                    and maze_state[3] == constants.OPEN
-                ):
-                    return True
-        elif move == constants.DOWN:
-            for maze_state in current_percept.maze_state:
-                if (
-                    maze_state[0] == 0
-                    and maze_state[1] == 1
-                    and maze_state[2] == constants.UP
-                    and maze_state[3] == constants.OPEN
-                ):
-                    return True
-
-        return False
+        # O(1) lookup of both doors between the current and the neighbouring cell
+        return current_percept.crossable(move)
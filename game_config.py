@@ -0,0 +1,51 @@
+import constants
+
+
+def map_dims(dims):
+    """Return (width, height) for a map size given either as a single side or as a (width, height) pair
+
+    The width is the extent along x, the first index of the frequencies, and the height the extent along y.
+    """
+    if isinstance(dims, (tuple, list)):
+        width, height = dims
+    else:
+        width = height = dims
+    return int(width), int(height)
+
+
+class GameConfig:
+    """Settings of a single game, read by the engine, the maze generator and validator, and the percepts"""
+
+    def __init__(self, max_door_frequency, radius, map_width=constants.map_dim, map_height=None, tile_size=None):
+        """
+            Args:
+                max_door_frequency (int): maximum frequency of the doors
+                radius (int): radius of the drone
+                map_width (int): extent of the maze along x
+                map_height (int): extent of the maze along y, the maze is square if not given
+                tile_size (int): generate mazes into a tile file with tiles of this size instead of in memory
+        """
+        self.max_door_frequency = max_door_frequency
+        self.radius = radius
+        self.map_width = int(map_width)
+        self.map_height = int(map_height) if map_height is not None else self.map_width
+        self.tile_size = tile_size
+
+    @classmethod
+    def from_args(cls, args):
+        """Build the config from the game options, see main.py"""
+        map_width = getattr(args, "map_width", None) or constants.map_dim
+        return cls(args.max_door_frequency, args.radius, map_width, getattr(args, "map_height", None),
+                   getattr(args, "tile_size", None))
+
+    @property
+    def dims(self):
+        return self.map_width, self.map_height
+
+    @dims.setter
+    def dims(self, dims):
+        self.map_width, self.map_height = map_dims(dims)
+
+    def __repr__(self):
+        return "GameConfig(max_door_frequency={}, radius={}, map_width={}, map_height={}, tile_size={})".format(
+            self.max_door_frequency, self.radius, self.map_width, self.map_height, self.tile_size)
@@ -0,0 +1,127 @@
+"""Logging of the engines through a queue, so the game never waits on its log files.
+
+The logger of a game only holds a QueueHandler. Its file handlers are run by a QueueListener on a background thread,
+which formats and writes the records, so a log call on the game thread costs a level check and, when the record is
+emitted, putting it on the queue.
+
+Every played turn can be logged as one structured record at the TURN level, below DEBUG, which is only enabled with
+--log_turns. The engines check the level before building the record, so a game logged at the default levels does no
+string work at all on the turns it plays. The record is written to debug.log as a line and to turns.jsonl as JSON.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+
+TURN = 5
+logging.addLevelName(TURN, "TURN")
+
+TURN_MESSAGE = ("Turn %(turn)d: action %(action)s accepted %(accepted)s, position (%(x)d, %(y)d), drone visual took "
+                "%(drone_visual_time).3fs, player took %(player_time).3fs")
+
+# Arguments of these types cannot change between the log call and the writer thread formatting the record
+_IMMUTABLE_TYPES = (str, int, float, bool, type(None), bytes)
+
+# Running GameLogs by logger name, a new game on the same logger replaces the handlers of the previous one
+_active_logs = {}
+
+
+def turn_record(turn, action, accepted, pos, drone_visual_time, player_time):
+    """Return the structured record of a turn, logged with TURN_MESSAGE as its format"""
+    return {
+        "turn": turn,
+        "action": action if type(action) is int else None,
+        "accepted": accepted,
+        "x": int(pos[0]),
+        "y": int(pos[1]),
+        "drone_visual_time": drone_visual_time,
+        "player_time": player_time,
+    }
+
+
+def _is_immutable(args):
+    values = args.values() if isinstance(args, dict) else args
+    return all(isinstance(value, _IMMUTABLE_TYPES) for value in values)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves the formatting of records to the writer thread
+
+    QueueHandler formats every record before putting it on the queue. Records whose arguments are immutable are put
+    on the queue as they are instead, others are formatted on the spot since the caller may change them afterwards.
+    """
+
+    def prepare(self, record):
+        if record.args and not _is_immutable(record.args):
+            return super().prepare(record)
+        return record
+
+
+class TurnRecordFilter(logging.Filter):
+    """Only let the structured turn records through"""
+
+    def filter(self, record):
+        return record.levelno == TURN and isinstance(record.args, dict)
+
+
+class TurnRecordFormatter(logging.Formatter):
+    """Format a turn record as a line of JSON"""
+
+    def format(self, record):
+        return json.dumps(record.args)
+
+
+class GameLogs:
+    """File handlers of the logger of a game, run on a background thread"""
+
+    def __init__(self, logger):
+        """
+            Args:
+                logger (logging.Logger): logger of the game, its records are queued for the handlers added
+        """
+        previous = _active_logs.get(logger.name)
+        if previous is not None:
+            previous.close()
+        _active_logs[logger.name] = self
+        self.logger = logger
+        self.queue = queue.Queue()
+        self.queue_handler = DeferredQueueHandler(self.queue)
+        self.listener = logging.handlers.QueueListener(self.queue, respect_handler_level=True)
+        logger.addHandler(self.queue_handler)
+        self.listener.start()
+        self.running = True
+
+    def add_handler(self, handler):
+        # The listener reads its handlers as a tuple, replacing it is safe while the thread runs
+        self.listener.handlers = self.listener.handlers + (handler,)
+
+    def add_turn_records(self, path):
+        """Write the structured turn records to path as JSON lines"""
+        handler = logging.FileHandler(path, mode="w")
+        handler.setLevel(TURN)
+        handler.setFormatter(TurnRecordFormatter())
+        handler.addFilter(TurnRecordFilter())
+        self.add_handler(handler)
+
+    def flush(self):
+        # Wait until the records logged so far are written, file handlers flush after every record
+        if self.running:
+            self.queue.join()
+
+    def close(self):
+        if self.running:
+            self.listener.stop()
+            self.running = False
+        self.logger.removeHandler(self.queue_handler)
+        for handler in self.listener.handlers:
+            handler.close()
+        if _active_logs.get(self.logger.name) is self:
+            del _active_logs[self.logger.name]
+
+
+@atexit.register
+def _close_logs():
+    # Write out the records still queued when the interpreter exits
+    for logs in list(_active_logs.values()):
+        logs.close()
@@ -0,0 +1,248 @@
+"""Opt-in profiling of the turns of a game, with the time of the engine and of the player told apart.
+
+Two profilers are available:
+    cprofile: deterministic, writes a .prof file to open with pstats or snakeviz
+    sampling: samples the stack of the game thread every millisecond from a background thread and writes the collapsed
+        stacks, one "frame;frame;frame count" line per stack, to a .collapsed file for flamegraph.pl or speedscope.
+        It slows the game down far less than cProfile
+
+Frames are tagged by the file of their code: the player's module and the files next to it are player frames, the
+other files of the repository are engine frames. Everything called from a player frame counts as player time, be it
+numpy, a helper module of the player or the percept methods, and frames of the standard library or of numpy called by
+the engine are engine frames. A hosted player runs in its own process, the round trip of its moves through
+player_host.py is counted as player time instead. The collapsed stacks carry the tag of every frame, and both profilers report the time
+spent in the engine and in the player.
+"""
+import abc
+import cProfile
+import inspect
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+import constants
+
+PROFILERS = constants.profilers
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+ENGINE = "engine"
+PLAYER = "player"
+
+
+def parse_turns(turns):
+    """Parse a turn selection such as "100-200", "500-" or "42" into an inclusive (first, last) range
+
+    Returns None, for every turn, if turns is empty. last is None for a range without end.
+    """
+    if not turns:
+        return None
+    first, sep, last = str(turns).partition("-")
+    first = int(first) if first else 1
+    if not sep:
+        return first, first
+    return first, int(last) if last else None
+
+
+class FrameTagger:
+    """Tag the files of code objects as engine or player frames"""
+
+    def __init__(self, player):
+        """
+            Args:
+                player: player of the game, the files in the directory of its module are player frames
+        """
+        self.player_dir = None
+        self.player_file = None
+        if type(player).__module__ == "player_host":
+            # The hosted player runs in its worker, the time the engine spends waiting on it in player_host.py is the
+            # player's. The directory of PlayerHost is the engine's. Checked by name, importing player_host would load
+            # multiprocessing in games that do not host their player
+            self.player_file = os.path.abspath(inspect.getfile(type(player)))
+        else:
+            if player is not None:
+                player_dir = os.path.dirname(inspect.getfile(type(player)))
+            else:
+                player_dir = os.path.join(REPO_DIR, "players")
+            self.player_dir = os.path.join(os.path.abspath(player_dir), "")
+        self.repo_dir = os.path.join(REPO_DIR, "")
+        self.tags = {}
+
+    def tag(self, filename):
+        # Returns ENGINE, PLAYER or None for files outside the repository and the player
+        tag = self.tags.get(filename)
+        if tag is None and filename not in self.tags:
+            path = os.path.abspath(filename)
+            if path == self.player_file or (self.player_dir is not None and path.startswith(self.player_dir)):
+                tag = PLAYER
+            elif path.startswith(self.repo_dir):
+                tag = ENGINE
+            self.tags[filename] = tag
+        return tag
+
+
+class GameProfiler(abc.ABC):
+    """Profile the selected turns of a game and write the profile when the game is over"""
+
+    suffix = None
+
+    def __init__(self, path, player, turns=None):
+        """
+            Args:
+                path (str): path of the profile, without its suffix
+                player: player of the game, to tell its frames from the engine's
+                turns (str): turns to profile, see parse_turns, every turn if not given
+        """
+        self.path = path + self.suffix
+        self.tagger = FrameTagger(player)
+        self.turns = parse_turns(turns)
+        self.profiled_turns = 0
+
+    @staticmethod
+    def create(profiler, path, player, turns=None):
+        """Return a profiler by name, see PROFILERS"""
+        if profiler == "cprofile":
+            return CProfileProfiler(path, player, turns)
+        if profiler == "sampling":
+            return SamplingProfiler(path, player, turns)
+        raise ValueError("Unknown profiler {}, expected one of {}".format(profiler, PROFILERS))
+
+    def start_turn(self, turn):
+        """Start profiling if the turn is selected, returns whether it is"""
+        if self.turns is not None:
+            first, last = self.turns
+            if turn < first or (last is not None and turn > last):
+                return False
+        self.profiled_turns += 1
+        self.enable()
+        return True
+
+    def end_turn(self):
+        self.disable()
+
+    @abc.abstractmethod
+    def enable(self):
+        """Start collecting, called at the start of every profiled turn"""
+
+    @abc.abstractmethod
+    def disable(self):
+        """Stop collecting, called at the end of every profiled turn"""
+
+    @abc.abstractmethod
+    def close(self):
+        """Write the profile, returns the summary of the time spent in the engine and in the player"""
+
+    def summary(self, engine_time, player_time):
+        return {
+            "profile": self.path,
+            "profiled_turns": self.profiled_turns,
+            "engine_time": engine_time,
+            "player_time": player_time,
+        }
+
+
+class CProfileProfiler(GameProfiler):
+    suffix = ".prof"
+
+    def __init__(self, path, player, turns=None):
+        super().__init__(path, player, turns)
+        self.profile = cProfile.Profile()
+
+    def enable(self):
+        self.profile.enable()
+
+    def disable(self):
+        self.profile.disable()
+
+    def close(self):
+        self.profile.create_stats()
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.profile.dump_stats(self.path)
+        # The player's time is the cumulative time of the calls made into player code from outside of it, the rest of
+        # the profiled time is the engine's
+        stats = pstats.Stats(self.profile)
+        player_time = 0.0
+        for (filename, _, _), (_, _, _, _, callers) in stats.stats.items():
+            if self.tagger.tag(filename) != PLAYER:
+                continue
+            for (caller_filename, _, _), caller_stats in callers.items():
+                if self.tagger.tag(caller_filename) != PLAYER:
+                    player_time += caller_stats[3]
+        return self.summary(stats.total_tt - player_time, player_time)
+
+
+class SamplingProfiler(GameProfiler):
+    suffix = ".collapsed"
+
+    def __init__(self, path, player, turns=None, interval=0.001):
+        super().__init__(path, player, turns)
+        self.interval = interval
+        self.stacks = Counter()
+        self.frame_names = {}
+        self.thread_id = None
+        self.active = threading.Event()
+        self.stopped = False
+        self.sampler = None
+        self.enabled_at = None
+        self.profiled_time = 0.0
+
+    def enable(self):
+        if self.sampler is None:
+            self.thread_id = threading.get_ident()
+            self.sampler = threading.Thread(target=self.sample, name="game-profiler", daemon=True)
+            self.sampler.start()
+        self.enabled_at = time.perf_counter()
+        self.active.set()
+
+    def disable(self):
+        self.active.clear()
+        self.profiled_time += time.perf_counter() - self.enabled_at
+
+    def sample(self):
+        # Runs on the sampler thread until the profiler is closed
+        while not self.stopped:
+            if not self.active.wait(0.1):
+                continue
+            time.sleep(self.interval)
+            frame = sys._current_frames().get(self.thread_id)
+            # close sets active to wake the sampler up, the game thread is in close then and is not sampled
+            if frame is not None and self.active.is_set() and not self.stopped:
+                self.stacks[self.collapse(frame)] += 1
+
+    def collapse(self, frame):
+        # Name the frames of the stack from the outermost one, frames called by the player are player frames and
+        # library frames are tagged as their caller
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        names = []
+        tag = ENGINE
+        for code in reversed(codes):
+            name = self.frame_names.get(code)
+            if name is None:
+                name = self.frame_names[code] = (
+                    "{}:{}".format(os.path.basename(code.co_filename), code.co_name), self.tagger.tag(code.co_filename))
+            if tag != PLAYER:
+                tag = name[1] or tag
+            names.append("{} [{}]".format(name[0], tag))
+        return ";".join(names), tag
+
+    def close(self):
+        self.stopped = True
+        self.active.set()
+        if self.sampler is not None:
+            self.sampler.join()
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        samples = Counter()
+        with open(self.path, "w") as f:
+            for (stack, tag), count in self.stacks.most_common():
+                f.write("{} {}\n".format(stack, count))
+                samples[tag] += count
+        # Split the profiled time in proportion to the samples, the sampling period drifts with the load
+        total = sum(samples.values())
+        if not total:
+            return self.summary(0.0, 0.0)
+        return self.summary(self.profiled_time * samples[ENGINE] / total, self.profiled_time * samples[PLAYER] / total)
@@ -1,18 +1,28 @@
+import argparse
 import numpy as np
-import json
+import constants
+from map_io import save_map
+
+parser = argparse.ArgumentParser(description="Generate a zig-zag maze")
+parser.add_argument("--max_door_frequency", "-m", type=int, default=5, help="Maximum frequency")
+parser.add_argument("--map_width", "-mw", type=int, default=constants.map_dim, help="Number of rows of the maze")
+parser.add_argument("--map_height", "-mh", type=int, help="Number of columns of the maze, square if not given")
+parser.add_argument("--output", "-o", default="simple.json", help="Path of the map, .json or .npy")
+args = parser.parse_args()
 
 # Constants
-L = 5  # Maximum frequency, you can change it as needed
-map_size = 100  # Size of the freq
+L = args.max_door_frequency  # Maximum frequency, you can change it as needed
+map_width = args.map_width  # Size of the freq
+map_height = args.map_height or map_width
 
 # Initialize freq with zeros (meaning all doors are always closed)
-freq = np.zeros((map_size, map_size, 4), dtype=int)
+freq = np.zeros((map_width, map_height, 4), dtype=int)
 
 # Create a zig-zag pattern
-for row in range(map_size):
+for row in range(map_width):
     if row % 2 == 0:
         # Moving left to right in even rows
-        for col in range(map_size):
+        for col in range(map_height):
             freq[row, col, 1] = L  # Open left door
             freq[row, col, 3] = L - 1  # Open right door
 
@@ -21,33 +31,26 @@ for row in range(map_size):
                 if row > 0:
                     freq[row, col, 0] = L - 1  # Open top door
 
-            if col == map_size - 1:
+            if col == map_height - 1:
                 freq[row, col, 3] = 0  # Close right door
-                if row < map_size - 1:
+                if row < map_width - 1:
                     freq[row, col, 2] = L  # Open bottom door
 
     else:
         # Moving left to right in odd rows
-        for col in range(map_size):
+        for col in range(map_height):
             freq[row, col, 1] = L  # Open left door
             freq[row, col, 3] = L - 1  # Open right door
 
             if col == 0:
                 freq[row, col, 1] = 0  # Close left door
-                if row < map_size - 1:
+                if row < map_width - 1:
                     freq[row, col, 2] = L  # Open bottom door
 
-            if col == map_size - 1:
+            if col == map_height - 1:
                 freq[row, col, 3] = 0  # Close right door
                 freq[row, col, 0] = L - 1  # Open top door
 
 
-# Save the freq to json file
-map = {
-    "frequencies": freq.tolist(),
-    "start_pos": [0, 0],
-    "end_pos": [map_size - 1, map_size - 1],
-}
-
-with open("simple.json", "w") as json_file:
-    json.dump(map, json_file)
+# Save the freq to json file, or in the binary format if the output ends with .npy
+save_map(args.output, [0, 0], [map_width - 1, map_height - 1], freq)
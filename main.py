@@ -1,6 +1,9 @@
 import argparse
+import constants
 from timing_maze_game import TimingMazeGame
-import tkinter as tk
+from turn_timers import format_histograms
+from maze_generator import GENERATOR_VERSIONS, LATEST_GENERATOR_VERSION
+from map_cache import DEFAULT_MAP_CACHE_SIZE
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
@@ -10,21 +13,72 @@ if __name__ == '__main__':
                         help="radius of the circle visible by the drone ""(min=1, max=150")
     parser.add_argument("--seed", "-s", type=int, default=2, help="Seed used by random number generator")
     parser.add_argument(
-        "--maze", "-mz", help="Use the given map, if no map is given, Generate a maze using the seed provided"
+        "--maze", "-mz", help="Use the given map, either JSON (.json) or binary (.npy, see map_io.py), if no map is "
+                              "given, Generate a maze using the seed provided"
     )
+    parser.add_argument("--map_width", "-mw", type=int, default=constants.map_dim,
+                        help="Extent of generated mazes along x, maps given with --maze keep their own size")
+    parser.add_argument("--map_height", "-mh", type=int,
+                        help="Extent of generated mazes along y, the maze is square if not given")
+    parser.add_argument("--tile_size", "-ts", type=int,
+                        help="Generate the maze into a memory-mapped file of tiles of this size, for mazes too large "
+                             "to keep in memory, only the tiles around the drone are loaded")
+    parser.add_argument("--generator_version", "-gv", type=int, default=LATEST_GENERATOR_VERSION,
+                        choices=GENERATOR_VERSIONS, help="Version of the random maze generator, version 1 reproduces "
+                                                        "the mazes of earlier releases for the same seed, version 3 "
+                                                        "repairs disconnected mazes instead of regenerating them")
+    parser.add_argument("--map_cache", "-mc", help="Directory of the map cache, generated mazes are stored there and "
+                                                   "reused by later games with the same generator parameters")
+    parser.add_argument("--map_cache_size", type=int, default=DEFAULT_MAP_CACHE_SIZE // 2 ** 20,
+                        help="Size limit of the map cache in MB, least recently used mazes are evicted beyond it")
     parser.add_argument("--scale", "-sc", default=9, help="Scale")
+    parser.add_argument("--turns", "-T", type=int, help="Maximum number of turns, unlimited if not given")
     parser.add_argument("--no_gui", "-ng", action="store_true", help="Disable GUI")
+    parser.add_argument("--frame_rate", "-fr", type=int,
+                        help="Play the game in the GUI as fast as possible and redraw this many times a second")
+    parser.add_argument("--render_every", "-re", type=int,
+                        help="Play the game in the GUI as fast as possible and redraw every this many turns")
     parser.add_argument("--log_path", default="log", help="Directory path to dump log files, filepath if "
                                                           "disable_logging is false")
     parser.add_argument("--disable_logging", action="store_true", help="Disable Logging, log_path becomes path to file")
+    parser.add_argument("--log_turns", action="store_true", help="Log a record of every turn to debug.log and, as JSON "
+                                                                 "lines, to turns.jsonl")
     parser.add_argument("--disable_timeout", action="store_true", help="Disable timeouts for player code")
-    parser.add_argument("--player", "-p", default="d", help="Specifying player")
+    parser.add_argument("--timeout", type=float, default=constants.timeout,
+                        help="Seconds the player may take for its initialization and for all its moves together")
+    parser.add_argument("--turn_timeout", "-tt", type=float,
+                        help="Seconds the player may take for a single move, a move past it is cancelled and the turn "
+                             "waits, no limit if not given")
+    parser.add_argument("--player", "-p", default="d",
+                        help="Specifying player: d, a group number, an installed timing_maze.players entry point, "
+                             "module:Class or path/to/player.py[:Class]")
+    parser.add_argument("--time_phases", "-tp", action="store_true",
+                        help="Time every phase of the turns and print their latency percentiles after the game")
+    parser.add_argument("--profile", "-pf", choices=constants.profilers,
+                        help="Profile the game and write the profile next to the logs, cprofile writes profile.prof and "
+                             "sampling profile.collapsed, see game_profiler.py")
+    parser.add_argument("--profile_turns", "-pt",
+                        help="Turns to profile, as 100-200, 500- or 42, every turn if not given")
+    parser.add_argument("--player_host", "-ph", action="store_true",
+                        help="Run the player in a worker process, percepts are sent through shared memory, and print "
+                             "the round trip latency of the moves after the game. The player gets its own rng spawned "
+                             "from the game's, so its draws differ from an in-process run")
+    parser.add_argument("--replay", "-rp", help="Record the game turn by turn in this replay file, see replay_log.py")
     args = parser.parse_args()
 
     if args.disable_logging:
         if args.log_path == "log":
             args.log_path = "results.log"
 
-    root = tk.Tk()
-    app = TimingMazeGame(args, root)
+    app = TimingMazeGame(args)
 
+    if app.timers is not None:
+        print(format_histograms(app.timers.histograms()))
+    if app.profile_summary is not None:
+        print("Profile written to {profile}, {profiled_turns} turns profiled\n"
+              "Engine: {engine_time:.3f}s, player: {player_time:.3f}s".format(**app.profile_summary))
+    if app.player_host and app.player is not None:
+        print(format_histograms(app.player.latency()))
+    for timeout in app.timeouts:
+        print("Player ran out of its {kind} time limit of {budget:.3f}s on turn {turn}".format(**timeout))
+    app.close()
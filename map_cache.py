@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import constants
+from game_config import map_dims
+from map_io import load_map, save_map, header_path
+
+DEFAULT_MAP_CACHE_DIR = ".map_cache"
+DEFAULT_MAP_CACHE_SIZE = 256 * 1024 * 1024
+
+
+class MapCache:
+    """On-disk cache of validated random mazes, keyed by the parameters they were generated from
+
+    Every entry is a binary map (see map_io.py) plus an <key>.entry.json marker that is written last, once the maze
+    has been validated. The marker also stores the state of the random number generator after generation, so a game
+    served from the cache continues with exactly the same random numbers as one that generated the maze itself.
+    Entries are evicted least recently used first once the cache grows beyond max_bytes.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_MAP_CACHE_DIR, max_bytes=DEFAULT_MAP_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(generator_version, seed, max_door_frequency, dims, rng_state, tile_size=None):
+        """Content address of a generated maze
+
+            Args:
+                generator_version (int): maze generator version
+                seed (int): seed of the game
+                max_door_frequency (int): maximum frequency of the doors
+                dims (Union[int, Tuple[int, int]]): size of the maze, as a single side or as (width, height)
+                rng_state (dict): state of the maze's random number generator right before generation, the state of
+                    the seed except for later games driven through reset() without a new seed
+                tile_size (int): tile size of a maze generated into a tile file, None for a maze generated in memory
+        """
+        params = {
+            "generator_version": generator_version,
+            "seed": seed,
+            "max_door_frequency": max_door_frequency,
+            "dims": list(map_dims(dims)),
+            "closed_prob": constants.CLOSED_PROB,
+            "rng_state": rng_state,
+            "tile_size": tile_size,
+        }
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+    def map_path(self, key):
+        return os.path.join(self.cache_dir, "{}.npy".format(key))
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, "{}.entry.json".format(key))
+
+    def get(self, key):
+        """Return (start_pos, end_pos, frequencies, repairs, rng_state) for a cached maze, None on a miss"""
+        try:
+            with open(self.entry_path(key), "r") as f:
+                entry = json.load(f)
+            start_pos, end_pos, frequencies = load_map(self.map_path(key))
+        except (OSError, ValueError):
+            return None
+        if not entry.get("validated"):
+            return None
+
+        # Mark the entry as recently used
+        os.utime(self.entry_path(key))
+        return start_pos, end_pos, frequencies, entry["repairs"], entry["rng_state"]
+
+    def put(self, key, start_pos, end_pos, frequencies, repairs, rng_state):
+        """Store a validated maze, then evict old entries if the cache is over its size limit"""
+        # Write to temporary names and rename, so concurrent games never read a partial entry
+        suffix = ".{}.tmp".format(os.getpid())
+        tmp_map_path = self.map_path(key + suffix)
+        save_map(tmp_map_path, start_pos, end_pos, frequencies)
+        os.replace(header_path(tmp_map_path), header_path(self.map_path(key)))
+        os.replace(tmp_map_path, self.map_path(key))
+
+        tmp_entry_path = self.entry_path(key) + suffix
+        with open(tmp_entry_path, "w") as f:
+            json.dump({"validated": True, "repairs": int(repairs), "rng_state": rng_state}, f)
+        os.replace(tmp_entry_path, self.entry_path(key))
+
+        self.evict()
+
+    def entry_files(self, key):
+        # The entry marker comes first, so an entry being evicted stops being served before its map goes
+        return [self.entry_path(key), self.map_path(key), header_path(self.map_path(key))]
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        total_bytes = 0
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith(".entry.json"):
+                continue
+            key = filename[:-len(".entry.json")]
+            try:
+                last_used = os.path.getmtime(self.entry_path(key))
+                size = sum(os.path.getsize(path) for path in self.entry_files(key))
+            except OSError:
+                continue
+            entries.append((last_used, key, size))
+            total_bytes += size
+
+        for last_used, key, size in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            for path in self.entry_files(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total_bytes -= size
+
+    def __len__(self):
+        return sum(1 for filename in os.listdir(self.cache_dir) if filename.endswith(".entry.json"))
@@ -0,0 +1,189 @@
+"""Reading and writing maze maps.
+
+Two formats are supported, picked by the file extension:
+
+- JSON (.json): {"frequencies": nested (width, height, 4) list, "start_pos": [x, y], "end_pos": [x, y], "dims": [width,
+  height]}, dims is optional and taken from the frequencies when missing
+- Binary (.npy): the frequencies as a raw uint8 .npy array, loaded memory-mapped, with a small JSON header next to it
+  at <name>.header.json holding start_pos, end_pos, dims, max_frequency and a checksum of the frequencies
+- Tiled binary (.npy with "layout": "tiled" in the header): the frequencies cut into tiles (see tiled_map.py) and
+  loaded as a TiledMap that only reads the tiles in use, with a crc32 per tile in the header instead of a checksum
+
+Convert between them with: python map_io.py maps/default/simple.json maps/default/simple.npy [--tile_size 256]
+"""
+import hashlib
+import json
+import os
+import numpy as np
+from tiled_map import TiledMap, DEFAULT_TILE_SIZE, create_tiles, tile_bounds, tile_checksum
+
+BINARY_MAP_FORMAT = "timing-maze-map"
+BINARY_MAP_VERSION = 1
+BINARY_MAP_DTYPE = np.uint8
+
+
+def is_binary_map(path):
+    return os.path.splitext(path)[1].lower() == ".npy"
+
+
+def header_path(path):
+    """Return the path of the header of a binary map"""
+    return os.path.splitext(path)[0] + ".header.json"
+
+
+def map_checksum(frequencies):
+    """sha256 of the frequencies as stored in a binary map"""
+    data = np.ascontiguousarray(frequencies, dtype=BINARY_MAP_DTYPE)
+    return "sha256:" + hashlib.sha256(data.tobytes()).hexdigest()
+
+
+def load_map(path, mmap=True, verify=True):
+    """Load a map in either format
+
+        Args:
+            path (str): path of a .json or .npy map
+            mmap (bool): memory-map the frequencies of a binary map instead of reading them into memory
+            verify (bool): check the frequencies of a binary map against the checksum in its header
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: start position, end position and door frequencies,
+                the frequencies of a memory-mapped binary map are read-only and those of a tiled map are a TiledMap
+    """
+    if not is_binary_map(path):
+        with open(path, "r") as f:
+            maze_obj = json.load(f)
+        frequencies = np.array(maze_obj["frequencies"])
+        if "dims" in maze_obj and list(frequencies.shape) != maze_obj["dims"] + [4]:
+            raise ValueError("Map {} has shape {}, its dims expect {}".format(path, frequencies.shape,
+                                                                            maze_obj["dims"] + [4]))
+        return np.array(maze_obj["start_pos"]), np.array(maze_obj["end_pos"]), frequencies
+
+    with open(header_path(path), "r") as f:
+        header = json.load(f)
+    if header.get("format") != BINARY_MAP_FORMAT or header.get("version") != BINARY_MAP_VERSION:
+        raise ValueError("{} is not a version {} binary map header".format(header_path(path), BINARY_MAP_VERSION))
+
+    if header.get("layout") == "tiled":
+        # Tiles are checked against their crc32 as they are read
+        frequencies = TiledMap(path, header["dims"], header["tile_size"], header["max_frequency"],
+                               header["tile_checksums"] if verify else None)
+        return np.array(header["start_pos"]), np.array(header["end_pos"]), frequencies
+
+    frequencies = np.load(path, mmap_mode="r" if mmap else None)
+    if list(frequencies.shape) != header["dims"] + [4]:
+        raise ValueError("Map {} has shape {}, its header expects {}".format(path, frequencies.shape,
+                                                                           header["dims"] + [4]))
+    if verify and map_checksum(frequencies) != header["checksum"]:
+        raise ValueError("Map {} does not match the checksum in its header".format(path))
+    return np.array(header["start_pos"]), np.array(header["end_pos"]), frequencies
+
+
+def binary_header(start_pos, end_pos, dims, max_frequency):
+    return {
+        "format": BINARY_MAP_FORMAT,
+        "version": BINARY_MAP_VERSION,
+        "start_pos": np.asarray(start_pos).tolist(),
+        "end_pos": np.asarray(end_pos).tolist(),
+        "dims": [int(n) for n in dims],
+        "max_frequency": int(max_frequency),
+    }
+
+
+def write_header(path, header):
+    with open(header_path(path), "w") as f:
+        json.dump(header, f, indent=4)
+
+
+def check_frequency_range(frequencies):
+    limits = np.iinfo(BINARY_MAP_DTYPE)
+    if frequencies.size and (frequencies.min() < limits.min or frequencies.max() > limits.max):
+        raise ValueError("Door frequencies must be between {} and {} to be stored in a binary map".format(
+            limits.min, limits.max))
+
+
+def write_tiled_header(path, start_pos, end_pos, tiles, dims):
+    """Write the header of a tile file once all of its tiles are written, reading them back one at a time
+
+        Args:
+            tiles (tiled_map.TileFile): the tile file, as returned by tiled_map.create_tiles
+            dims (Tuple[int, int]): (width, height) of the maze
+    """
+    tiles_x, tiles_y, tile_size = tiles.shape[:3]
+    tile_checksums = [[0] * tiles_y for _ in range(tiles_x)]
+    max_frequency = 0
+    for tx in range(tiles_x):
+        for ty in range(tiles_y):
+            tile = tiles.read(tx, ty)
+            tile_checksums[tx][ty] = tile_checksum(tile)
+            max_frequency = max(max_frequency, int(tile.max()))
+    header = binary_header(start_pos, end_pos, dims, max_frequency)
+    header.update({"layout": "tiled", "tile_size": int(tile_size), "tile_checksums": tile_checksums})
+    write_header(path, header)
+
+
+def save_tiled_map(path, start_pos, end_pos, frequencies, tile_size=DEFAULT_TILE_SIZE):
+    """Save a map in the tiled binary format, copying the frequencies one tile at a time
+
+        Args:
+            frequencies (Union[np.ndarray, TiledMap]): door frequencies, a TiledMap is streamed without being loaded
+    """
+    dims = frequencies.shape[:2]
+    tiles = create_tiles(path, dims, tile_size)
+    for tx, ty, x0, x1, y0, y1 in tile_bounds(dims, tile_size):
+        tile = np.asarray(frequencies[x0:x1, y0:y1])
+        check_frequency_range(tile)
+        tiles.write(tx, ty, tile)
+    write_tiled_header(path, start_pos, end_pos, tiles, dims)
+    tiles.close()
+
+
+def save_map(path, start_pos, end_pos, frequencies, tile_size=None):
+    """Save a map, in the binary format if path ends with .npy and as JSON otherwise
+
+    A binary map is tiled if tile_size is given or if the frequencies are a TiledMap, which keeps its tile size.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if isinstance(frequencies, TiledMap) and is_binary_map(path):
+        tile_size = tile_size or frequencies.tile_size
+    if tile_size and is_binary_map(path):
+        save_tiled_map(path, start_pos, end_pos, frequencies, tile_size)
+        return
+    if isinstance(frequencies, TiledMap):
+        frequencies = frequencies[:, :]
+
+    if not is_binary_map(path):
+        frequencies = np.asarray(frequencies)
+        data = {
+            "frequencies": frequencies.tolist(),
+            "start_pos": np.asarray(start_pos).tolist(),
+            "end_pos": np.asarray(end_pos).tolist(),
+            "dims": list(frequencies.shape[:2])
+        }
+        with open(path, "w") as f:
+            json.dump(data, f)
+        return
+
+    frequencies = np.asarray(frequencies)
+    check_frequency_range(frequencies)
+    frequencies = np.ascontiguousarray(frequencies, dtype=BINARY_MAP_DTYPE)
+    header = binary_header(start_pos, end_pos, frequencies.shape[:2], frequencies.max() if frequencies.size else 0)
+    header["checksum"] = map_checksum(frequencies)
+    np.save(path, frequencies)
+    write_header(path, header)
+
+
+if __name__ == '__main__':
+    # Only the command line needs argparse, the engines import this module on every game
+    import argparse
+    parser = argparse.ArgumentParser(description="Convert a map between the JSON (.json) and binary (.npy) formats")
+    parser.add_argument("source", help="Map to convert")
+    parser.add_argument("destination", help="Path of the converted map, the format follows the extension")
+    parser.add_argument("--tile_size", "-ts", type=int,
+                        help="Store a binary map in tiles of this size, for mazes too large to keep in memory")
+    args = parser.parse_args()
+
+    start_pos, end_pos, frequencies = load_map(args.source, mmap=False)
+    save_map(args.destination, start_pos, end_pos, frequencies, args.tile_size)
+    print("Converted {} to {}".format(args.source, args.destination))
@@ -0,0 +1,251 @@
+import numpy as np
+import constants
+from game_config import map_dims
+from maze_validator import label_components
+from map_io import load_map, write_tiled_header
+from tiled_map import DEFAULT_TILE_SIZE, create_tiles, tile_bounds
+from door_clock import FREQUENCY_DTYPE
+
+# Version 1 reproduces the original per-door generation loop bit-for-bit for a given seed,
+# version 2 draws the same distribution in bulk, version 3 draws like version 2 and then repairs
+# disconnected mazes instead of leaving them to be rejected
+GENERATOR_VERSIONS = (1, 2, 3)
+LATEST_GENERATOR_VERSION = 2
+# Past this many cells isolated cells are all but certain at CLOSED_PROB and versions 1 and 2 would be rejected forever,
+# so their mazes are repaired like version 3 ones. Mazes up to the default size are left as earlier releases drew them
+MAX_UNREPAIRED_AREA = constants.map_dim * constants.map_dim
+
+
+def generate_positions(rng, width, height):
+    """Draw a start and an end position that differ in both coordinates"""
+    start_pos = np.array([rng.integers(0, width), rng.integers(0, height)])
+    while 1:
+        end_pos = np.array([rng.integers(0, width), rng.integers(0, height)])
+        if end_pos[0] != start_pos[0] and end_pos[1] != start_pos[1]:
+            return start_pos, end_pos
+
+
+def generate_frequencies_v1(rng, max_door_frequency, width, height):
+    # One draw per door in (i, j, k) order, as the original TimingMazeGame.initialize did
+    frequencies = np.zeros((width, height, 4), dtype=int)
+    for i in range(width):
+        for j in range(height):
+            for k in range(4):
+                if rng.random() < constants.CLOSED_PROB:
+                    frequencies[i][j][k] = 0
+                else:
+                    frequencies[i][j][k] = rng.integers(1, max_door_frequency)
+    return frequencies
+
+
+def generate_frequencies_v2(rng, max_door_frequency, width, height):
+    closed = rng.random((width, height, 4)) < constants.CLOSED_PROB
+    frequencies = rng.integers(1, max_door_frequency, size=(width, height, 4))
+    frequencies[closed] = 0
+    return frequencies
+
+
+def zero_boundary_doors(frequencies):
+    """Assign n=0 to all boundary doors, in place"""
+    frequencies[0, :, constants.LEFT] = 0
+    frequencies[-1, :, constants.RIGHT] = 0
+    frequencies[:, 0, constants.UP] = 0
+    frequencies[:, -1, constants.DOWN] = 0
+    return frequencies
+
+
+def repair_connectivity(rng, frequencies, max_door_frequency):
+    """Join the disconnected components of a maze by opening the fewest passages, in place
+
+    c components need exactly c - 1 new passages. Candidate passages between neighbouring cells of different
+    components are visited in a random order drawn from rng, and a passage is opened when it joins two components
+    that are still apart. Doors that are already open at some point keep their frequency, closed ones get a new
+    frequency drawn like any other door.
+
+        Returns:
+            int: number of passages opened
+    """
+    component_count, labels = label_components(frequencies)
+    if component_count == 1:
+        return 0
+
+    # Passages between (x, y) and (x + 1, y), then between (x, y) and (x, y + 1)
+    right_x, right_y = np.nonzero(labels[:-1, :] != labels[1:, :])
+    down_x, down_y = np.nonzero(labels[:, :-1] != labels[:, 1:])
+    xs = np.concatenate((right_x, down_x))
+    ys = np.concatenate((right_y, down_y))
+    is_down = np.concatenate((np.zeros(right_x.size, dtype=bool), np.ones(down_x.size, dtype=bool)))
+
+    component_parent = list(range(component_count))
+
+    def find(component):
+        while component_parent[component] != component:
+            component_parent[component] = component_parent[component_parent[component]]
+            component = component_parent[component]
+        return component
+
+    repairs = 0
+    for index in rng.permutation(xs.size).tolist():
+        x, y = int(xs[index]), int(ys[index])
+        if is_down[index]:
+            nx, ny, door, neighbour_door = x, y + 1, constants.DOWN, constants.UP
+        else:
+            nx, ny, door, neighbour_door = x + 1, y, constants.RIGHT, constants.LEFT
+        a, b = find(labels[x, y]), find(labels[nx, ny])
+        if a == b:
+            continue
+        component_parent[max(a, b)] = min(a, b)
+        if frequencies[x, y, door] == 0:
+            frequencies[x, y, door] = rng.integers(1, max_door_frequency)
+        if frequencies[nx, ny, neighbour_door] == 0:
+            frequencies[nx, ny, neighbour_door] = rng.integers(1, max_door_frequency)
+        repairs += 1
+        if repairs == component_count - 1:
+            break
+    return repairs
+
+
+def generate_maze(rng, max_door_frequency, dims=constants.map_dim, version=LATEST_GENERATOR_VERSION):
+    """Generate a random maze, which still has to be validated
+
+        Args:
+            rng (np.random.Generator): random number generator of the game
+            max_door_frequency (int): maximum frequency of the doors
+            dims (Union[int, Tuple[int, int]]): size of the maze, as a single side or as (width, height)
+            version (int): generator version, see GENERATOR_VERSIONS
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray, int]: start position, end position, door frequencies and
+                the number of passages opened to connect the maze (always 0 before version 3 for mazes of up to
+                MAX_UNREPAIRED_AREA cells)
+    """
+    if version == 1:
+        generate_frequencies = generate_frequencies_v1
+    elif version in (2, 3):
+        generate_frequencies = generate_frequencies_v2
+    else:
+        raise ValueError("Unknown maze generator version {}".format(version))
+
+    width, height = map_dims(dims)
+    start_pos, end_pos = generate_positions(rng, width, height)
+    frequencies = generate_frequencies(rng, max_door_frequency, width, height)
+    zero_boundary_doors(frequencies)
+    repairs = 0
+    if version == 3 or width * height > MAX_UNREPAIRED_AREA:
+        repairs = repair_connectivity(rng, frequencies, max_door_frequency)
+    if max_door_frequency <= np.iinfo(FREQUENCY_DTYPE).max:
+        frequencies = frequencies.astype(FREQUENCY_DTYPE)
+    return start_pos, end_pos, frequencies, repairs
+
+
+def connect_tiles(rng, tiles, edges, max_door_frequency):
+    """Join neighbouring tiles that are each connected on their own into a connected maze, in place
+
+    Tiles are joined like repair_connectivity joins components: pairs of neighbouring tiles are visited in a random
+    order, and a passage at a random place along their shared edge is opened when they are still apart. Only the
+    edges of the tiles are needed to find the passages, a tile is read and written back when a door is opened in it.
+
+        Args:
+            tiles (tiled_map.TileFile): the tile file
+            edges (dict): frequencies along the (left, up, right, down) edges of every tile, keyed by (tx, ty)
+        Returns:
+            int: number of passages opened
+    """
+    tiles_x, tiles_y = tiles.shape[:2]
+    tile_parent = list(range(tiles_x * tiles_y))
+
+    def find(tile):
+        while tile_parent[tile] != tile:
+            tile_parent[tile] = tile_parent[tile_parent[tile]]
+            tile = tile_parent[tile]
+        return tile
+
+    # Neighbouring tiles as (tx, ty, is_down), joining tiles that already share an open passage
+    pairs = []
+    for tx in range(tiles_x):
+        for ty in range(tiles_y):
+            for is_down in (False, True):
+                if is_down and ty + 1 < tiles_y:
+                    ntx, nty = tx, ty + 1
+                    passages = (edges[tx, ty][constants.DOWN] != 0) & (edges[ntx, nty][constants.UP] != 0)
+                elif not is_down and tx + 1 < tiles_x:
+                    ntx, nty = tx + 1, ty
+                    passages = (edges[tx, ty][constants.RIGHT] != 0) & (edges[ntx, nty][constants.LEFT] != 0)
+                else:
+                    continue
+                if passages.any():
+                    a, b = find(tx * tiles_y + ty), find(ntx * tiles_y + nty)
+                    tile_parent[max(a, b)] = min(a, b)
+                else:
+                    pairs.append((tx, ty, is_down))
+
+    repairs = 0
+    for index in rng.permutation(len(pairs)).tolist():
+        tx, ty, is_down = pairs[index]
+        ntx, nty = (tx, ty + 1) if is_down else (tx + 1, ty)
+        a, b = find(tx * tiles_y + ty), find(ntx * tiles_y + nty)
+        if a == b:
+            continue
+        tile_parent[max(a, b)] = min(a, b)
+        # The shared edge is as long as the edge of the tile along it
+        last = tiles.tile_size - 1
+        if is_down:
+            i = int(rng.integers(0, edges[tx, ty][constants.DOWN].size))
+            doors = ((tx, ty, i, last, constants.DOWN), (ntx, nty, i, 0, constants.UP))
+        else:
+            i = int(rng.integers(0, edges[tx, ty][constants.RIGHT].size))
+            doors = ((tx, ty, last, i, constants.RIGHT), (ntx, nty, 0, i, constants.LEFT))
+        for door_tx, door_ty, x, y, door in doors:
+            tile = tiles.read(door_tx, door_ty)
+            if tile[x, y, door] == 0:
+                tile[x, y, door] = rng.integers(1, max_door_frequency)
+                tiles.write(door_tx, door_ty, tile)
+        repairs += 1
+    return repairs
+
+
+def generate_tiled_maze(rng, max_door_frequency, dims, path, tile_size=DEFAULT_TILE_SIZE):
+    """Generate a connected random maze straight into a tile file, one tile at a time
+
+    Doors are drawn like version 2 draws them, tile by tile. Every tile is repaired into a single component on its
+    own, as version 3 repairs a whole maze, then the tiles are joined with connect_tiles. Only one tile is generated
+    in memory at a time. The repairs are not the fewest possible, since passages through neighbouring tiles are not
+    considered when a tile is repaired.
+
+        Args:
+            dims (Union[int, Tuple[int, int]]): size of the maze, as a single side or as (width, height)
+            path (str): path of the tile file to write, a .npy file with its header next to it
+            tile_size (int): side of a tile
+        Returns:
+            Tuple[np.ndarray, np.ndarray, TiledMap, int]: start position, end position, door frequencies and the
+                number of passages opened to connect the maze
+    """
+    width, height = map_dims(dims)
+    start_pos, end_pos = generate_positions(rng, width, height)
+
+    tiles = create_tiles(path, (width, height), tile_size)
+    edges = {}
+    repairs = 0
+    for tx, ty, x0, x1, y0, y1 in tile_bounds((width, height), tile_size):
+        frequencies = generate_frequencies_v2(rng, max_door_frequency, x1 - x0, y1 - y0)
+        # Only the edges of the tile on the boundary of the maze are closed
+        if x0 == 0:
+            frequencies[0, :, constants.LEFT] = 0
+        if x1 == width:
+            frequencies[-1, :, constants.RIGHT] = 0
+        if y0 == 0:
+            frequencies[:, 0, constants.UP] = 0
+        if y1 == height:
+            frequencies[:, -1, constants.DOWN] = 0
+        repairs += repair_connectivity(rng, frequencies, max_door_frequency)
+        tiles.write(tx, ty, frequencies)
+        edges[tx, ty] = {
+            constants.LEFT: frequencies[0, :, constants.LEFT].copy(),
+            constants.UP: frequencies[:, 0, constants.UP].copy(),
+            constants.RIGHT: frequencies[-1, :, constants.RIGHT].copy(),
+            constants.DOWN: frequencies[:, -1, constants.DOWN].copy(),
+        }
+
+    repairs += connect_tiles(rng, tiles, edges, max_door_frequency)
+    write_tiled_header(path, start_pos, end_pos, tiles, (width, height))
+    tiles.close()
+    return start_pos, end_pos, load_map(path)[2], repairs
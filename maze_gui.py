@@ -0,0 +1,232 @@
+"""Tkinter window of a TimingMazeGame.
+
+The engines only import this module when the GUI is requested, so headless games, simulations and servers without a
+display never load tkinter.
+"""
+import time
+import tkinter as tk
+import numpy as np
+import constants
+
+DEFAULT_FRAME_RATE = 30
+# Game speeds cycled by the 1X/4X/Max button, with the delay between turns of the paced speeds in ms
+SPEEDS = ("normal", "fast", "max")
+TURN_DELAYS = {"normal": 200, "fast": 5}
+
+
+class MazeGui:
+    """Window of a game with Pause, Start/Resume, 1X/4X/Max and Step controls
+
+    At 1X and 4X a turn is played every 200 ms and 5 ms and every turn is drawn. At Max the game is played as fast as
+    the engine goes and the view only shows the latest turn, redrawn frame_rate times a second or every render_every
+    turns, so long games can be watched in seconds. Pause and Step work at every speed.
+    """
+
+    def __init__(self, game, root=None, frame_rate=None, render_every=None):
+        """
+            Args:
+                game (TimingMazeGame): game to draw and control, from timing_maze_game or timing_maze_game_simulation
+                root (tk.Tk): tkinter root window, a new one is created if not given
+                frame_rate (int): redraws per second at Max speed
+                render_every (int): redraw every this many turns at Max speed instead of at the frame rate
+        """
+        self.game = game
+        self.root = root if root is not None else tk.Tk()
+        # Asking for a frame rate or a redraw interval starts the game at Max speed
+        self.start_speed = "max" if frame_rate or render_every else "normal"
+        self.game_speed = self.start_speed
+        self.frame_rate = frame_rate or DEFAULT_FRAME_RATE
+        self.render_every = render_every
+        self.rate_turns = 0
+        self.rate_time = time.perf_counter()
+        self.canvas_width = 155 * game.scale
+        self.canvas_height = 100 * game.scale
+        self.drawn_table = None
+        self.layout_grid()
+        self.canvas = tk.Canvas(self.root, height=self.canvas_height, width=self.canvas_width, bg="#FCF1E3")
+        self.canvas.pack()
+
+    def run(self):
+        # Draw the maze and hand over to tkinter until the window is closed
+        self.draw_grid()
+        self.root.mainloop()
+
+    def play(self):
+        # At 1X and 4X every scheduled call plays a single turn, at Max it plays turns until the next frame is due
+        game = self.game
+        if game.game_state == "over":
+            # A call scheduled before the game ended
+            return
+        if self.game_speed == "max":
+            frame_end = time.perf_counter() + 1 / self.frame_rate
+            played = 0
+            while True:
+                over = game.play_turn()
+                played += 1
+                # A paused game only plays the turn of a Step
+                if over or game.game_state != "resume" or played == self.render_every:
+                    break
+                if not self.render_every and time.perf_counter() >= frame_end:
+                    break
+            self.draw_grid()
+            if not over and game.game_state == "resume":
+                self.root.after(1, self.play)
+        elif not game.play_turn() and game.game_state == "resume":
+            self.root.after(TURN_DELAYS[self.game_speed], self.play)
+
+    def turn_played(self):
+        # Called by the game after every turn, turns played at Max speed are drawn once their frame is over
+        if self.game_speed != "max":
+            self.draw_grid()
+
+    def resume(self):
+        if self.game.game_state == "pause":
+            self.game.game_state = "resume"
+            self.game_speed = self.start_speed
+            self.root.after(50, self.play)
+
+    def pause(self):
+        if self.game.game_state != "over":
+            self.game.game_state = "pause"
+
+    def single_step(self):
+        if self.game.game_state != "over":
+            self.game.game_state = "pause"
+            self.root.after(100, self.play)
+
+    def toggle_speed(self):
+        if self.game.game_state == "resume":
+            self.game_speed = SPEEDS[(SPEEDS.index(self.game_speed) + 1) % len(SPEEDS)]
+
+    def layout_grid(self):
+        # Shrink the cells of mazes larger than the default size, so that the grid still fits on the canvas
+        map_width, map_height = self.game.config.dims
+        self.cell_size = min(constants.CELL_SIZE,
+                             max(1, constants.map_dim * constants.CELL_SIZE // max(map_width, map_height)))
+        self.grid_width = map_width * self.cell_size
+        self.grid_height = map_height * self.cell_size
+        self.x_offset = (self.canvas_width - self.grid_width) // 2
+        self.y_offset = (self.canvas_height - self.grid_height) // 4
+
+    def draw_grid(self):
+        # Show and hide the doors that opened or closed since the last call and move the drone. The canvas items are
+        # created on the first call only, and the doors of a frequency all open and close together, so they are
+        # reconfigured at once through their tag and a turn costs one call per changed frequency whatever the size
+        # of the maze
+        game = self.game
+        # Games that keep per-phase timers are charged the drawing as their render phase
+        timers = getattr(game, "timers", None)
+        if timers is not None:
+            timers.start()
+        if self.drawn_table is None:
+            self.create_items()
+        # Before the first turn the doors are drawn as they will be on turn 1
+        open_table = game.door_clock.open_table(max(game.turns, 1))
+        for frequency in np.flatnonzero(open_table != self.drawn_table).tolist():
+            self.canvas.itemconfigure("frequency{}".format(frequency),
+                                      state="hidden" if open_table[frequency] else "normal")
+        self.drawn_table = open_table
+
+        self.move_drone(game.cur_pos)
+        self.canvas.itemconfigure(self.turns_text, text="Turns: {}".format(game.turns))
+        self.canvas.itemconfigure(self.cur_pos_text, text="Cur Pos: {}".format(game.cur_pos))
+        self.update_rate()
+        if timers is not None:
+            timers.lap("render")
+
+    def update_rate(self):
+        # Show the turns per second played since the rate was last shown, at most twice a second
+        now = time.perf_counter()
+        if now - self.rate_time >= 0.5 or self.game.turns < self.rate_turns:
+            rate = max(self.game.turns - self.rate_turns, 0) / (now - self.rate_time)
+            self.canvas.itemconfigure(self.rate_text, text="Turns/s: {:.0f}".format(rate))
+            self.rate_turns, self.rate_time = self.game.turns, now
+
+    def create_items(self):
+        # Create the canvas items that live for the whole game, with every door tagged by its frequency
+        game = self.game
+        self.canvas.delete("all")  # Clear the canvas
+        open_table = game.door_clock.open_table(max(game.turns, 1))
+        frequencies = game.door_clock.frequencies[:, :].tolist()
+
+        for i in range(game.config.map_width):
+            for j in range(game.config.map_height):
+                x1, y1 = self.x_offset + i * self.cell_size, self.y_offset + j * self.cell_size
+                x2, y2 = x1 + self.cell_size, y1 + self.cell_size
+                cell_frequencies = frequencies[i][j]
+
+                # Doors with frequency 1 are always open and never drawn
+                for door_type, frequency in enumerate(cell_frequencies):
+                    if frequency == 1:
+                        continue
+                    options = dict(width=0.5, tags=("door", "frequency{}".format(frequency)),
+                                   state="hidden" if open_table[frequency] else "normal")
+                    if door_type == constants.UP:  # Top door
+                        self.canvas.create_line(x1, y1+0.5, x2, y1+0.5, fill="blue", **options)
+                    elif door_type == constants.RIGHT:  # Right door
+                        self.canvas.create_line(x2-0.5, y1, x2-0.5, y2, fill="blue", **options)
+                    elif door_type == constants.DOWN:  # Bottom door
+                        self.canvas.create_line(x1, y2-0.5, x2, y2-0.5, fill="red", **options)
+                    else:  # Left door
+                        self.canvas.create_line(x1+0.5, y1, x1+0.5, y2, fill="red", **options)
+        self.drawn_table = open_table
+
+        # Mark the start, cur, and end positions
+        self.mark_position(game.start_pos, "green")
+        self.drone_items = self.mark_position(game.cur_pos, "orange", True)
+        self.drone_pos = tuple(int(v) for v in game.cur_pos)
+        self.mark_position(game.end_pos, "red")
+        self.create_buttons()
+        self.turns_text = self.canvas.create_text(650, 20, text="Turns: {}".format(game.turns), font=("Arial", 14),
+                                                  fill="black", activefill="gray", tags="turns text")
+        self.canvas.create_text(750, 20, text="Start Pos: {}".format(game.start_pos), font=("Arial", 14), fill="black",
+                                activefill="gray", tags="turns text")
+        self.canvas.create_text(900, 20, text="End Pos: {}".format(game.end_pos), font=("Arial", 14), fill="black",
+                                activefill="gray", tags="turns text")
+        self.cur_pos_text = self.canvas.create_text(1050, 20, text="Cur Pos: {}".format(game.cur_pos),
+                                                    font=("Arial", 14), fill="black", activefill="gray",
+                                                    tags="turns text")
+        self.rate_text = self.canvas.create_text(1200, 20, text="Turns/s: -", font=("Arial", 14), fill="black",
+                                                 activefill="gray", tags="turns text")
+
+    def move_drone(self, pos):
+        # Move the drone marker and its radius circle by the offset of the drone since the last draw
+        x, y = int(pos[0]), int(pos[1])
+        dx, dy = x - self.drone_pos[0], y - self.drone_pos[1]
+        if dx or dy:
+            for item in self.drone_items:
+                self.canvas.move(item, dx * self.cell_size, dy * self.cell_size)
+            self.drone_pos = (x, y)
+
+    def create_buttons(self):
+        # Create text-based "Pause" button on the canvas
+        self.pause_btn = self.canvas.create_text(250, 20, text="Pause", font=("Arial", 14), fill="black",
+                                                 activefill="gray", tags="pause_button")
+        self.canvas.tag_bind("pause_button", "<Button-1>", lambda e: self.pause())
+
+        # Create a text-based "Reset" button on the canvas
+        self.resume_btn = self.canvas.create_text(350, 20, text="Start/Resume", font=("Arial", 14), fill="black",
+                                                  activefill="gray", tags="resume_button")
+        self.canvas.tag_bind("resume_button", "<Button-1>", lambda e: self.resume())
+
+        self.resume_btn = self.canvas.create_text(450, 20, text="1X/4X/Max", font=("Arial", 14), fill="black",
+                                                  activefill="gray", tags="speed_button")
+        self.canvas.tag_bind("speed_button", "<Button-1>", lambda e: self.toggle_speed())
+
+        self.step_btn = self.canvas.create_text(550, 20, text="Step", font=("Arial", 14), fill="black",
+                                                  activefill="gray", tags="step_button")
+        self.canvas.tag_bind("step_button", "<Button-1>", lambda e: self.single_step())
+
+    def mark_position(self, pos, color, withCircle = False):
+        # Returns the ids of the marker and of its radius circle
+        x, y = pos
+
+        x1, y1 = self.x_offset + x * self.cell_size + 2, self.y_offset + y * self.cell_size + 2
+        x2, y2 = x1+5, y1+5
+        items = [self.canvas.create_rectangle(x1, y1, x2, y2, fill=color)]
+
+        if withCircle:
+            cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+            r = self.game.radius*self.cell_size
+            items.append(self.canvas.create_oval(cx - r, cy - r, cx + r, cy + r, fill="", outline="blue", width=1))
+        return items
@@ -0,0 +1,145 @@
+"""Offline solver for the fewest turns a maze can be played in, given the real door timing.
+
+The player may wait in a cell, so reaching a cell earlier is never worse than reaching it later: from any cell every
+crossing that can be made later can also be made after waiting. The time-expanded graph over (cell, turn mod period)
+therefore never has to be built, an earliest-arrival Dijkstra over the cells alone is exact. Each edge is relaxed in
+O(1) with the next turn it can be crossed from EdgeSchedule, so the solver costs O(cells log cells) whatever the
+period lcm(1..L) of the maze, and runs on every map of a sweep.
+"""
+import argparse
+import heapq
+import numpy as np
+import constants
+from door_clock import EdgeSchedule
+from drone_visibility import visibility_stencil
+from map_io import load_map
+
+# Offset of the neighbouring cell for each move, indexed by LEFT, UP, RIGHT, DOWN
+MOVE_OFFSETS = ((-1, 0), (0, -1), (1, 0), (0, 1))
+
+
+def solve_maze(frequencies, start_pos, end_pos, schedule=None):
+    """Return the fewest turns to go from start_pos to end_pos, None if the end cannot be reached
+
+    The result counts turns the way the game does: the game starts on turn 1 and ends on the turn the move into the
+    end cell is made, which is what TimingMazeGame.turns holds when the goal is reached.
+
+        Args:
+            frequencies (Union[np.ndarray, TiledMap]): (width, height, 4) array of door frequencies
+            start_pos (np.ndarray): start cell
+            end_pos (np.ndarray): end cell
+            schedule (EdgeSchedule): schedule of the maze, built from frequencies if not given
+        Returns:
+            int: the turn on which the end cell is reached
+    """
+    if schedule is None:
+        schedule = EdgeSchedule(frequencies)
+    end = (int(end_pos[0]), int(end_pos[1]))
+    turn = earliest_arrival(schedule, start_pos, {end})
+    return None if turn is None else max(turn, 1)
+
+
+def solve_sighting(frequencies, start_pos, end_pos, radius, schedule=None):
+    """Return the fewest turns a game that ends once the end cell is in view can last, None if it is never seen
+
+    This is the objective of the simulation engine, which ends the game on the turn whose percept shows the end: the
+    percept of a turn is taken before its move, so a game first standing in a cell that sees the end after turn t
+    lasts t + 1 turns. The end is seen from a cell when any of its doors is within radius, as in drone_visual.
+
+        Args:
+            frequencies (Union[np.ndarray, TiledMap]): (width, height, 4) array of door frequencies
+            start_pos (np.ndarray): start cell
+            end_pos (np.ndarray): end cell
+            radius (int): radius of the drone
+            schedule (EdgeSchedule): schedule of the maze, built from frequencies if not given
+        Returns:
+            int: the number of turns, TimingMazeGame.turns of a game played optimally
+    """
+    if schedule is None:
+        schedule = EdgeSchedule(frequencies)
+    width, height = schedule.dims
+    end_x, end_y = int(end_pos[0]), int(end_pos[1])
+    # The end is seen from the cells at the offsets of the stencil away from it
+    seen = visibility_stencil(radius).any(axis=2)
+    goals = {(end_x - i + radius, end_y - j + radius) for i, j in np.argwhere(seen).tolist()}
+    goals = {(x, y) for x, y in goals if 0 <= x < width and 0 <= y < height}
+    turn = earliest_arrival(schedule, start_pos, goals)
+    return None if turn is None else turn + 1
+
+
+def earliest_arrival(schedule, start_pos, goals):
+    """Return the earliest turn on which any of the goal cells is reached from start_pos, 0 for the start itself
+
+        Args:
+            schedule (EdgeSchedule): schedule of the maze
+            start_pos (np.ndarray): start cell
+            goals (Set[Tuple[int, int]]): goal cells
+        Returns:
+            int: the turn, None if no goal can be reached
+    """
+    width, height = schedule.dims
+    start = (int(start_pos[0]), int(start_pos[1]))
+
+    if schedule.period_x is not None:
+        # Read the periods of dense maps from lists, which index much faster than arrays one cell at a time
+        period_x, period_y = schedule.period_x.tolist(), schedule.period_y.tolist()
+
+        def period(x, y, move):
+            if move == constants.LEFT:
+                return period_x[x - 1][y] if x > 0 else 0
+            if move == constants.UP:
+                return period_y[x][y - 1] if y > 0 else 0
+            if move == constants.RIGHT:
+                return period_x[x][y] if x < width - 1 else 0
+            return period_y[x][y] if y < height - 1 else 0
+    else:
+        period = schedule.period
+
+    # arrival[x][y] is the turn on which the player is first in cell (x, y), the start is reached before turn 1
+    arrival = [[None] * height for _ in range(width)]
+    arrival[start[0]][start[1]] = 0
+    heap = [(0, start)]
+    while heap:
+        turn, cell = heapq.heappop(heap)
+        x, y = cell
+        if turn > arrival[x][y]:
+            continue
+        if cell in goals:
+            return turn
+        # The first move from the cell is made on the next turn
+        next_turn = turn + 1
+        for move, (dx, dy) in enumerate(MOVE_OFFSETS):
+            cell_period = period(x, y, move)
+            if cell_period == 0:
+                continue
+            crossed = -(-next_turn // cell_period) * cell_period
+            nx, ny = x + dx, y + dy
+            if arrival[nx][ny] is None or crossed < arrival[nx][ny]:
+                arrival[nx][ny] = crossed
+                heapq.heappush(heap, (crossed, (nx, ny)))
+    return None
+
+
+def competitive_ratio(turns, optimal_turns, finished):
+    """Return turns over the optimal number of turns for a game that met its objective, None otherwise"""
+    if not finished or not optimal_turns:
+        return None
+    return turns / optimal_turns
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute the fewest turns a map can be played in")
+    parser.add_argument("maze", help="Path of the map, .json or .npy")
+    parser.add_argument("--radius", "-r", type=int,
+                        help="Also print the fewest turns to see the end with a drone of this radius")
+    args = parser.parse_args()
+
+    start_pos, end_pos, frequencies = load_map(args.maze)
+    optimal_turns = solve_maze(frequencies, start_pos, end_pos)
+    if optimal_turns is None:
+        print("The end of {} cannot be reached".format(args.maze))
+    else:
+        print("Fewest turns for {}: {}".format(args.maze, optimal_turns))
+        if args.radius is not None:
+            print("Fewest turns to see the end with radius {}: {}".format(
+                args.radius, solve_sighting(frequencies, start_pos, end_pos, args.radius)))
@@ -0,0 +1,206 @@
+import numpy as np
+import constants
+from game_config import map_dims
+from tiled_map import TiledMap
+
+
+class MazeValidation:
+    """Outcome of validate_maze, truthy if the maze is valid"""
+
+    def __init__(self, message=None, offending_doors=None, component_count=None, labels=None):
+        """
+            Args:
+                message (str): why the maze is invalid, None if it is valid
+                offending_doors (np.ndarray): (n, 3) array of the (x, y, door_type) doors failing a frequency or
+                    boundary check
+                component_count (int): number of connected components, if the reachability check was run
+                labels (np.ndarray): (width, height) component label of each cell, if the reachability check was run
+                    on a dense map
+        """
+        self.message = message
+        self.offending_doors = offending_doors if offending_doors is not None else np.zeros((0, 3), dtype=int)
+        self.component_count = component_count
+        self.labels = labels
+
+    @property
+    def is_valid(self):
+        return self.message is None
+
+    def __bool__(self):
+        return self.is_valid
+
+    def __repr__(self):
+        if self.is_valid:
+            return "MazeValidation(valid)"
+        return "MazeValidation({!r}, offending_doors={}, component_count={})".format(
+            self.message, len(self.offending_doors), self.component_count)
+
+
+def mutual_open_edges(frequencies):
+    """Return the passages between neighbouring cells whose doors on both sides open at some point
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (width - 1, height) boolean array of the passages between (x, y) and
+                (x + 1, y), and (width, height - 1) boolean array of the passages between (x, y) and (x, y + 1)
+    """
+    right = (frequencies[:-1, :, constants.RIGHT] != 0) & (frequencies[1:, :, constants.LEFT] != 0)
+    down = (frequencies[:, :-1, constants.DOWN] != 0) & (frequencies[:, 1:, constants.UP] != 0)
+    return right, down
+
+
+def union_roots(node_count, u, v):
+    """Join the nodes along the edges (u, v) with a vectorized union-find
+
+        Returns:
+            np.ndarray: the root of every node, which is the smallest node of its component
+    """
+    # Every node points to a node with a smaller index in its component, roots point to themselves.
+    # Hook the larger root of every edge under the smaller one, then compress paths, until all edges are settled.
+    parent = np.arange(node_count)
+    while True:
+        root_u, root_v = parent[u], parent[v]
+        unsettled = root_u != root_v
+        if not unsettled.any():
+            break
+        np.minimum.at(parent, np.maximum(root_u, root_v)[unsettled], np.minimum(root_u, root_v)[unsettled])
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+    return parent
+
+
+def label_components(frequencies):
+    """Label the connected components of the maze with a vectorized union-find
+
+        Returns:
+            Tuple[int, np.ndarray]: the number of components and the (width, height) component label of each cell,
+                labels are numbered from 0 in order of their smallest cell
+    """
+    width, height = frequencies.shape[:2]
+    cells = np.arange(width * height).reshape(width, height)
+    right, down = mutual_open_edges(frequencies)
+    u = np.concatenate((cells[:-1, :][right], cells[:, :-1][down]))
+    v = np.concatenate((cells[1:, :][right], cells[:, 1:][down]))
+
+    roots, labels = np.unique(union_roots(width * height, u, v), return_inverse=True)
+    return roots.size, labels.reshape(width, height)
+
+
+def count_tiled_components(tiled_map):
+    """Count the connected components of a tiled maze, streaming it one tile at a time
+
+    Every tile is labelled on its own, then the labels on both sides of the passages between neighbouring tiles are
+    joined, so only the edges of the tiles are kept in memory.
+
+        Returns:
+            int: the number of components
+    """
+    label_count = 0
+    # Labels and open doors along the last row / column of every tile, to join them with the next tile
+    right_edges = {}
+    down_edges = {}
+    u, v = [], []
+    size = tiled_map.tile_size
+    for x0, y0, tile in tiled_map.iter_tiles():
+        tx, ty = x0 // size, y0 // size
+        count, labels = label_components(tile)
+        labels = labels + label_count
+        label_count += count
+
+        if tx > 0:
+            left_labels, left_open = right_edges.pop((tx - 1, ty))
+            passages = left_open & (tile[0, :, constants.LEFT] != 0)
+            u.append(left_labels[passages])
+            v.append(labels[0, :][passages])
+        if ty > 0:
+            up_labels, up_open = down_edges.pop((tx, ty - 1))
+            passages = up_open & (tile[:, 0, constants.UP] != 0)
+            u.append(up_labels[passages])
+            v.append(labels[:, 0][passages])
+        right_edges[(tx, ty)] = labels[-1, :], tile[-1, :, constants.RIGHT] != 0
+        down_edges[(tx, ty)] = labels[:, -1], tile[:, -1, constants.DOWN] != 0
+
+    u = np.concatenate(u) if u else np.zeros(0, dtype=int)
+    v = np.concatenate(v) if v else np.zeros(0, dtype=int)
+    return np.unique(union_roots(label_count, u, v)).size
+
+
+def tiled_offending_doors(tiled_map, max_door_frequency):
+    """Return the doors of a tiled maze that fail the frequency and the boundary checks, streaming it by tile"""
+    width, height = tiled_map.dims
+    out_of_range, open_boundary = [], []
+    for x0, y0, tile in tiled_map.iter_tiles():
+        offset = np.array([x0, y0, 0])
+        # Frequencies are stored as unsigned integers, so they cannot be negative
+        out_of_range.append(np.argwhere(tile > max_door_frequency) + offset)
+        boundary = np.zeros(tile.shape, dtype=bool)
+        if x0 == 0:
+            boundary[0, :, constants.LEFT] = tile[0, :, constants.LEFT] != 0
+        if x0 + tile.shape[0] == width:
+            boundary[-1, :, constants.RIGHT] = tile[-1, :, constants.RIGHT] != 0
+        if y0 == 0:
+            boundary[:, 0, constants.UP] = tile[:, 0, constants.UP] != 0
+        if y0 + tile.shape[1] == height:
+            boundary[:, -1, constants.DOWN] = tile[:, -1, constants.DOWN] != 0
+        open_boundary.append(np.argwhere(boundary) + offset)
+    return np.concatenate(out_of_range), np.concatenate(open_boundary)
+
+
+def validate_maze(frequencies, start_pos, end_pos, max_door_frequency, dims=constants.map_dim):
+    """Check a maze for the size, door frequencies, boundary doors, start and end, and reachability of all cells
+
+    A TiledMap is validated one tile at a time, and its validation does not carry component labels.
+
+        Args:
+            frequencies (Union[np.ndarray, TiledMap]): door frequencies of the maze
+            dims (Union[int, Tuple[int, int]]): expected size of the maze, as a single side or as (width, height)
+        Returns:
+            MazeValidation: truthy if the maze is valid, otherwise describes the first failed check
+    """
+    # Check the size of the map
+    width, height = map_dims(dims)
+    if frequencies.shape != (width, height, 4):
+        return MazeValidation("Error with map size: expected {} but got {}".format(
+            (width, height, 4), frequencies.shape))
+
+    if isinstance(frequencies, TiledMap):
+        out_of_range, open_boundary = tiled_offending_doors(frequencies, max_door_frequency)
+    else:
+        out_of_range = np.argwhere((frequencies < 0) | (frequencies > max_door_frequency))
+        boundary = np.zeros(frequencies.shape, dtype=bool)
+        boundary[0, :, constants.LEFT] = frequencies[0, :, constants.LEFT] != 0
+        boundary[-1, :, constants.RIGHT] = frequencies[-1, :, constants.RIGHT] != 0
+        boundary[:, 0, constants.UP] = frequencies[:, 0, constants.UP] != 0
+        boundary[:, -1, constants.DOWN] = frequencies[:, -1, constants.DOWN] != 0
+        open_boundary = np.argwhere(boundary)
+
+    # Check that all doors have a frequency between 0 and max_door_frequency
+    if len(out_of_range):
+        return MazeValidation("Error with frequency: {} doors outside [0, {}]".format(
+            len(out_of_range), max_door_frequency), out_of_range)
+
+    # Check that all boundary doors have n=0 in map_frequencies.
+    if len(open_boundary):
+        return MazeValidation("Error with boundary: {} boundary doors are not always closed".format(
+            len(open_boundary)), open_boundary)
+
+    # Check that map has a valid start and end position.
+    if not (0 <= start_pos[0] < width and 0 <= start_pos[1] < height):
+        return MazeValidation("Error with start: {} is outside the map".format(list(start_pos)))
+
+    if not (0 <= end_pos[0] < width and 0 <= end_pos[1] < height):
+        return MazeValidation("Error with end: {} is outside the map".format(list(end_pos)))
+
+    # Check if all cells are reachable from one-another, i.e. the passages that open at some point
+    # connect the whole map into a single component
+    if isinstance(frequencies, TiledMap):
+        component_count, labels = count_tiled_components(frequencies), None
+    else:
+        component_count, labels = label_components(frequencies)
+    if component_count != 1:
+        return MazeValidation("Error with reachability: the maze has {} disconnected components".format(
+            component_count), component_count=component_count, labels=labels)
+
+    return MazeValidation(component_count=component_count, labels=labels)
@@ -0,0 +1,276 @@
+"""Host a player in its own worker process, so a slow or crashing player cannot stall the engine.
+
+PlayerHost stands in for the player object in the engine. The player is built in a persistent worker process, every
+turn the percept is written to a block of shared memory as the int16 (n, 4) array percept along with a few header
+fields, a one byte message on a pipe wakes the worker up and the move comes back on the same pipe as a packed struct.
+Nothing is pickled on the way. The log records of the player are sent back to the engine and written to the player's
+log like those of an in-process player.
+
+The worker cannot share the random number generator of the engine. A hosted player gets its own generator, spawned
+from the engine's without drawing from it: the maze and the engine's draws are those of an in-process game and a
+hosted game is reproducible for a seed, but a player that uses rng draws different numbers than it would in-process,
+and does not follow the generator when the engine reseeds it.
+
+A player that overruns its time limit is killed, see PlayerHost.move, and can be started again in a new worker with
+PlayerHost.restart, which builds a new player. The round trip of every move, and the time the
+player took inside the worker, are kept in a TurnTimers so the cost of hosting can be compared with in-process calls.
+"""
+import logging
+import logging.handlers
+import multiprocessing
+import struct
+import threading
+import time
+import weakref
+from multiprocessing import shared_memory
+import numpy as np
+from drone_visibility import visibility_stencil
+from player_registry import load_player
+from timing_maze_state import TimingMazeState
+from turn_timers import TurnTimers
+from utils import TimeoutException
+
+# Header fields of the percept in shared memory, followed by the rows of the array percept
+HEADER_FIELDS = ("rows", "is_end_visible", "end_x", "end_y", "start_x", "start_y", "map_width", "map_height", "turn")
+HEADER_DTYPE = np.int64
+TURN_MESSAGE = b"t"
+STOP_MESSAGE = b"s"
+# Reply of the worker: status, move and the time the player took in ns, followed by the error for EXCEPTION
+REPLY = struct.Struct("<bbq")
+MOVE, NO_MOVE, INVALID, EXCEPTION, READY = range(5)
+# Stand-in for a move of a type that cannot be sent back, the engine rejects it as an invalid action type
+INVALID_MOVE = "invalid move"
+LATENCY_PHASES = ("round_trip", "player")
+STOP_TIMEOUT = 5
+
+
+def percept_size(radius):
+    """Bytes of shared memory holding the largest percept of a drone of the given radius"""
+    rows = int(visibility_stencil(radius).sum())
+    return len(HEADER_FIELDS) * np.dtype(HEADER_DTYPE).itemsize + rows * 4 * np.dtype(np.int16).itemsize
+
+
+def _percept_views(buffer, radius):
+    # Header and door rows of the percept, as arrays over the shared memory
+    header = np.ndarray((len(HEADER_FIELDS),), dtype=HEADER_DTYPE, buffer=buffer)
+    rows = int(visibility_stencil(radius).sum())
+    doors = np.ndarray((rows, 4), dtype=np.int16, buffer=buffer, offset=header.nbytes)
+    return header, doors
+
+
+def _serve(conn, memory_name, player, player_args, radius, logger_name, log_level, log_queue):
+    # Entry point of the worker process: build the player and answer moves until told to stop
+    memory = shared_memory.SharedMemory(name=memory_name)
+    header, doors = _percept_views(memory.buf, radius)
+    logger = logging.getLogger(logger_name)
+    if log_queue is not None:
+        logger.setLevel(log_level)
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        logger.propagate = False
+    else:
+        logger.disabled = True
+
+    try:
+        player = load_player(player)(logger=logger, **player_args)
+    except Exception as e:
+        conn.send_bytes(REPLY.pack(EXCEPTION, 0, 0) + repr(e).encode())
+        return
+    conn.send_bytes(REPLY.pack(READY, 0, 0))
+    array_percept = getattr(player, "array_percept", False)
+
+    while True:
+        try:
+            message = conn.recv_bytes()
+        except EOFError:
+            break
+        if message == STOP_MESSAGE:
+            break
+        rows, is_end_visible, end_x, end_y, start_x, start_y, map_width, map_height, turn = header.tolist()
+        # The player may keep the percept, so its doors are copied out of the shared memory
+        percept = TimingMazeState(doors[:rows].copy(), bool(is_end_visible), end_x, end_y, start_x, start_y,
+                                  array_percept=array_percept, radius=radius, map_dims=(map_width, map_height),
+                                  turn=turn)
+        error = b""
+        start = time.perf_counter_ns()
+        try:
+            move = player.move(current_percept=percept)
+            if move is None:
+                status, move = NO_MOVE, 0
+            elif type(move) is int and -128 <= move <= 127:
+                status = MOVE
+            else:
+                status, move = INVALID, 0
+        except Exception as e:
+            status, move, error = EXCEPTION, 0, repr(e).encode()
+        conn.send_bytes(REPLY.pack(status, move, time.perf_counter_ns() - start) + error)
+    del header, doors
+    memory.close()
+
+
+def _forward_records(log_queue):
+    # Hand the records logged in the worker to the loggers of the same name in the engine
+    while True:
+        record = log_queue.get()
+        if record is None:
+            break
+        logging.getLogger(record.name).handle(record)
+
+
+def _stop_worker(process, conn):
+    # Ask the worker to stop, kill it if it does not
+    try:
+        conn.send_bytes(STOP_MESSAGE)
+    except (OSError, ValueError):
+        pass
+    process.join(STOP_TIMEOUT)
+    if process.is_alive():
+        process.kill()
+        process.join()
+    conn.close()
+
+
+def _stop(worker, memory, log_queue, log_thread):
+    # Stop the current worker, a [process, conn] list, and release the resources of the host, also called at exit for
+    # hosts that were never closed
+    if worker:
+        _stop_worker(*worker)
+    if log_queue is not None:
+        log_queue.put(None)
+        log_thread.join()
+    try:
+        memory.close()
+    except BufferError:
+        # Arrays of a host still alive at exit point into the memory, it is unmapped with the process
+        pass
+    memory.unlink()
+
+
+class PlayerHost:
+    """Player running in a worker process, with the interface of a player"""
+
+    # The engine builds the array percept for hosted players, it is what goes through the shared memory
+    array_percept = True
+
+    def __init__(self, player, logger, radius, timeout=None, **player_args):
+        """
+            Args:
+                player (str): class reference of the player, see player_registry.py, only the worker imports it
+                logger (logging.Logger): logger of the player, the records of the worker are written through it
+                radius (int): radius of the drone, sizes the shared memory
+                timeout (float): seconds the player may take to start, the worker is killed and TimeoutException
+                    raised past it, no limit if not given
+                **player_args: the other arguments of the player class, sent to the worker once, rng is replaced by a
+                    generator spawned from it
+        """
+        self.player = player
+        self.radius = radius
+        self.timers = TurnTimers(LATENCY_PHASES)
+        self.memory = shared_memory.SharedMemory(create=True, size=percept_size(radius))
+        self.header, self.doors = _percept_views(self.memory.buf, radius)
+        # Number of times the worker was started again after it was killed
+        self.restarts = 0
+
+        # spawn rather than fork, the engine runs threads that a forked worker would inherit in an unknown state
+        self.context = multiprocessing.get_context("spawn")
+        self.log_queue = log_thread = None
+        if not logger.disabled:
+            self.log_queue = self.context.Queue()
+            log_thread = threading.Thread(target=_forward_records, args=(self.log_queue,), name="player-logs",
+                                          daemon=True)
+            log_thread.start()
+        self.logger_name = logger.name
+        self.log_level = logger.getEffectiveLevel()
+        self.player_args = dict(player_args, radius=radius)
+        if self.player_args.get("rng") is not None:
+            self.player_args["rng"] = self.player_args["rng"].spawn(1)[0]
+        # Process and pipe of the current worker, replaced by restart
+        self.worker = []
+        self.process = self.conn = None
+        self._finalizer = weakref.finalize(self, _stop, self.worker, self.memory, self.log_queue, log_thread)
+        try:
+            self._start(timeout)
+        except BaseException:
+            self.close()
+            raise
+
+    def _start(self, timeout):
+        # Start a worker and wait for the player to be built in it
+        self.conn, worker_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_serve, name="player-host", daemon=True,
+            args=(worker_conn, self.memory.name, self.player, self.player_args, self.radius, self.logger_name,
+                  self.log_level, self.log_queue))
+        self.process.start()
+        worker_conn.close()
+        self.worker[:] = (self.process, self.conn)
+
+        try:
+            status, _, _, error = self._reply(timeout)
+        except (EOFError, OSError):
+            status, error = EXCEPTION, self._exit_message()
+        if status != READY:
+            raise RuntimeError("Player {} failed to start: {}".format(self.player, error))
+
+    def restart(self, timeout=None):
+        """Start a new worker after the player was killed, the new player starts from scratch
+
+        The player's rng is in the state it was in when the host was created. TimeoutException is raised if the player
+        takes more than timeout seconds to start, and RuntimeError if it fails to.
+        """
+        _stop_worker(self.process, self.conn)
+        self.restarts += 1
+        self._start(timeout)
+
+    def _exit_message(self):
+        # The pipe closes before the process is reaped, wait for its exit code
+        self.process.join(STOP_TIMEOUT)
+        return "The player process exited with code {}".format(self.process.exitcode)
+
+    def _reply(self, timeout=None):
+        if timeout is not None and not self.conn.poll(timeout):
+            # The player overran its time, it cannot be interrupted in the middle of a move so the worker is killed
+            self.process.kill()
+            _stop_worker(self.process, self.conn)
+            raise TimeoutException
+        reply = self.conn.recv_bytes()
+        status, move, player_ns = REPLY.unpack_from(reply)
+        return status, move, player_ns, reply[REPLY.size:].decode()
+
+    def move(self, current_percept, timeout=None):
+        """Send the percept to the worker and return the move of the player
+
+        If the player takes more than timeout seconds the worker is killed and TimeoutException raised, the player
+        cannot move anymore until restart is called.
+        """
+        if not self.process.is_alive():
+            raise RuntimeError(self._exit_message())
+        start = time.perf_counter_ns()
+        rows = current_percept.maze_array.shape[0]
+        self.doors[:rows] = current_percept.maze_array
+        self.header[:] = (rows, current_percept.is_end_visible, getattr(current_percept, "end_x", 0),
+                          getattr(current_percept, "end_y", 0), current_percept.start_x, current_percept.start_y,
+                          *current_percept.map_dims, current_percept.turn)
+        try:
+            self.conn.send_bytes(TURN_MESSAGE)
+            status, move, player_ns, error = self._reply(timeout)
+        except (EOFError, OSError):
+            raise RuntimeError(self._exit_message())
+        self.timers.samples["round_trip"].append(time.perf_counter_ns() - start)
+        self.timers.samples["player"].append(player_ns)
+
+        if status == MOVE:
+            return move
+        if status == NO_MOVE:
+            return None
+        if status == INVALID:
+            return INVALID_MOVE
+        raise RuntimeError(error)
+
+    def latency(self):
+        """Percentiles of the round trip of the moves and of the time the player took, in microseconds"""
+        return self.timers.histograms()
+
+    def close(self):
+        """Stop the worker process"""
+        self.header = self.doors = None
+        self._finalizer()
@@ -0,0 +1,94 @@
+"""Registry of the players, imported on demand so a game only pays for the player it plays.
+
+A player is selected by name:
+    d, 1 to 9: players of the repository, players/default_player.py and players/g<n>_player.py
+    the name of an entry point in the timing_maze.players group, for players installed by other packages, e.g. in
+        their pyproject.toml:
+            [project.entry-points."timing_maze.players"]
+            mine = "my_package.my_player:Player"
+    module.path:Class, path/to/player.py or path/to/player.py:Class: any module or file, the class is Player if not
+        given
+
+A name resolves to a reference "module:Class" or "file.py:Class", which load_player imports. Nothing is imported
+before a player is selected, and hosted players import it in their worker only, see player_host.py.
+"""
+import functools
+import importlib
+import importlib.util
+import os
+import sys
+import constants
+
+ENTRY_POINT_GROUP = "timing_maze.players"
+PLAYER_CLASS = "Player"
+# Module of the players of the repository by name
+BUILTIN_PLAYERS = {"d": "players.default_player"}
+BUILTIN_PLAYERS.update({name: "players.g{}_player".format(name) for name in constants.possible_players if name != "d"})
+# Players loaded from a file are registered in sys.modules under this prefix and the name of the file
+FILE_MODULE_PREFIX = "timing_maze_players."
+
+
+def find_player(name):
+    """Return the display name and class reference of the player selected by name, None if there is no such player
+
+    Only the entry points of installed packages are read, and only for names that are not players of the repository,
+    no player module is imported.
+    """
+    module = BUILTIN_PLAYERS.get(name)
+    if module is not None:
+        # The groups without a player in the repository are not available
+        if importlib.util.find_spec(module) is None:
+            return None
+        player_name = "Default Player" if name == "d" else "Group {}".format(name)
+        return player_name, "{}:{}".format(module, PLAYER_CLASS)
+
+    # Only read for names that are not players of the repository, importlib.metadata is slow to import
+    from importlib import metadata
+    for entry_point in metadata.entry_points(group=ENTRY_POINT_GROUP):
+        if entry_point.name == name:
+            return entry_point.name, entry_point.value
+
+    path, class_name = _split_reference(name)
+    if path.endswith(".py"):
+        if not os.path.isfile(path):
+            return None
+        # The worker of a hosted player may not share the working directory
+        return os.path.splitext(os.path.basename(path))[0], "{}:{}".format(os.path.abspath(path), class_name)
+    if ":" in name:
+        try:
+            if importlib.util.find_spec(path) is None:
+                return None
+        except (ImportError, ValueError):
+            # A parent package that does not exist, or an empty module name
+            return None
+        return path.rpartition(".")[2], "{}:{}".format(path, class_name)
+    return None
+
+
+def load_player(reference):
+    """Import the module of a class reference returned by find_player and return the class"""
+    path, class_name = _split_reference(reference)
+    if path.endswith(".py"):
+        module_name = FILE_MODULE_PREFIX + os.path.splitext(os.path.basename(path))[0]
+        module = sys.modules.get(module_name)
+        if module is None:
+            spec = importlib.util.spec_from_file_location(module_name, path)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[module_name] = module
+            try:
+                spec.loader.exec_module(module)
+            except BaseException:
+                del sys.modules[module_name]
+                raise
+    else:
+        module = importlib.import_module(path)
+    return functools.reduce(getattr, class_name.split("."), module)
+
+
+def _split_reference(reference):
+    # Split "module:Class" or "file.py:Class" in two, the class is Player when not given. The colon of a Windows drive
+    # is not a separator
+    path, sep, class_name = reference.rpartition(":")
+    if not sep or not class_name.replace(".", "").isidentifier():
+        return reference, PLAYER_CLASS
+    return path, class_name
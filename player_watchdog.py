@@ -0,0 +1,122 @@
+"""Time limits on player code that work in any thread, unlike SIGALRM which only works in the main thread.
+
+A single watchdog thread keeps the deadlines of the calls in progress. When a call overruns its deadline the watchdog
+raises TimeoutException in the thread making the call, through PyThreadState_SetAsyncExc, so games played in thread
+pools or embedded runners are held to their budgets as well. The exception is raised as soon as the player's thread
+runs Python code again: a player blocked inside a single native call is only cancelled when that call returns. Hosted
+players, see player_host.py, are waited for with a timeout on their pipe and killed instead.
+
+An exception raised at an arbitrary point can break code that takes locks in Python, the watchdog waits for the thread
+to leave the import system and threading before raising it. Other libraries the player uses are not protected.
+"""
+import itertools
+import sys
+import threading
+import time
+from utils import TimeoutException
+
+# Files whose code the exception must not be raised in, see _holds_locks
+_LOCKING_FILES = frozenset(("<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>",
+                            threading.__file__))
+# Seconds before trying again to cancel a call that is in one of those files
+RETRY_INTERVAL = 0.001
+
+
+def _holds_locks(frame):
+    # Whether the thread runs the Python code of the import system or of threading, which take and release locks in
+    # Python: an exception raised in there, say in the middle of a lazy import of numpy, can leave a lock held forever.
+    # Only the frames of the call are looked at, every thread started by threading has its frames at the bottom
+    while frame is not None and frame.f_code is not Watchdog.call.__code__:
+        if frame.f_code.co_filename in _LOCKING_FILES:
+            return True
+        frame = frame.f_back
+    return False
+
+
+def _set_async_exc(thread_id, exception):
+    # Raise exception in the thread at its next bytecode, a None exception clears the one pending. ctypes is only
+    # imported once a call overruns, first on the watchdog thread, games within their budgets never load it
+    import ctypes
+    ctypes.pythonapi.PyThreadState_SetAsyncExc(
+        ctypes.c_ulong(thread_id), None if exception is None else ctypes.py_object(exception))
+
+
+class Watchdog:
+    """Thread cancelling the calls that overrun their deadline"""
+
+    def __init__(self):
+        # The threads making calls only take the lock with a bare with statement: acquiring it and entering the block
+        # run no Python code, so the exception cannot be raised in between and leave the lock held. Condition's
+        # __enter__ and __exit__ are Python methods, the condition is only entered by the watchdog thread
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        # Deadline, thread id and whether the exception was raised, of every call in progress by token
+        self.armed = {}
+        self.tokens = itertools.count()
+        self.thread = None
+
+    def call(self, budget, func, *args, **kwargs):
+        """Return func(*args, **kwargs), raising TimeoutException if it takes more than budget seconds
+
+        The call is not limited if budget is None.
+        """
+        if budget is None:
+            return func(*args, **kwargs)
+        token = self.arm(budget)
+        try:
+            result = func(*args, **kwargs)
+            self.disarm(token)
+        except BaseException:
+            self.disarm(token)
+            raise
+        return result
+
+    def arm(self, budget):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.watch, name="player-watchdog", daemon=True)
+                self.thread.start()
+            token = next(self.tokens)
+            self.armed[token] = [time.monotonic() + budget, threading.get_ident(), False]
+            self.condition.notify()
+        return token
+
+    def disarm(self, token):
+        # Raises TimeoutException if the deadline passed, whether or not the exception already reached the thread,
+        # so a call that overran always fails and no exception is left pending for the code that follows. The exception
+        # may still be raised in here, with the entry already popped, which fails the call all the same
+        with self.lock:
+            entry = self.armed.pop(token, None)
+            if entry is None or not entry[2]:
+                return
+            # Withdraw the exception if the thread has not raised it yet
+            _set_async_exc(entry[1], None)
+        raise TimeoutException
+
+    def watch(self):
+        # Runs on the watchdog thread, raises the exception in the threads whose deadline passed
+        with self.condition:
+            while True:
+                pending = [entry for entry in self.armed.values() if not entry[2]]
+                if not pending:
+                    self.condition.wait()
+                    continue
+                now = time.monotonic()
+                frames = None
+                for entry in pending:
+                    if entry[0] > now:
+                        continue
+                    if frames is None:
+                        frames = sys._current_frames()
+                    if _holds_locks(frames.get(entry[1])):
+                        # Try again shortly, once the thread is out of the import or the lock
+                        entry[0] = now + RETRY_INTERVAL
+                        continue
+                    _set_async_exc(entry[1], TimeoutException)
+                    entry[2] = True
+                next_deadline = min((entry[0] for entry in pending if not entry[2]), default=None)
+                self.condition.wait(None if next_deadline is None else next_deadline - now)
+
+
+# Shared by every game of the process
+WATCHDOG = Watchdog()
@@ -9,6 +9,9 @@ from experience import Experience
 
 
 class Player:
+    # Receive the visible doors as an int16 (n, 4) numpy array instead of a list of tuples
+    array_percept = True
+
     def __init__(
         self,
         rng: np.random.Generator,
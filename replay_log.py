@@ -0,0 +1,245 @@
+"""Compact binary record of a game, and a tool to inspect and replay it without the player.
+
+A replay file starts with the magic bytes TMREPLAY, the length of a JSON header as a little-endian uint32 and the
+header itself. The header references the maze, either by the path of the map that was loaded or by the parameters
+and random number generator state it was generated from, along with a checksum of the door frequencies. Then comes one
+fixed-size record per turn: the action returned by the player (INVALID_ACTION when it was missing or malformed),
+whether the move was accepted, and the position of the drone at the end of the turn, 6 bytes per turn for mazes up to
+65535 cells wide. Records are read through a memory map, so any turn is reached in O(1), and the doors of any turn
+follow from the door clock.
+
+Usage: python replay_log.py game.tmr [--turn N] [--stats [PATH]] [--gui]
+"""
+import argparse
+import hashlib
+import json
+import os
+import struct
+import numpy as np
+import constants
+from door_clock import DoorClock
+from map_io import load_map, map_checksum
+
+REPLAY_MAGIC = b"TMREPLAY"
+REPLAY_FORMAT = "timing-maze-replay"
+REPLAY_VERSION = 1
+INVALID_ACTION = -2
+_HEADER_LENGTH = struct.Struct("<I")
+
+
+def position_dtype(dims):
+    """Smallest unsigned dtype holding the positions of a maze of the given (width, height)"""
+    return "<u2" if max(dims) <= np.iinfo(np.uint16).max else "<u4"
+
+
+def record_dtype(dims):
+    """numpy dtype of a turn record, packed without padding"""
+    position = position_dtype(dims)
+    return np.dtype([("action", "i1"), ("accepted", "u1"), ("x", position), ("y", position)])
+
+
+def maze_checksum(frequencies):
+    """Checksum of the door frequencies, from the tile checksums for a tiled map"""
+    if isinstance(frequencies, np.ndarray):
+        return map_checksum(frequencies)
+    if frequencies.tile_checksums is None:
+        return None
+    return "tiles:sha256:" + hashlib.sha256(json.dumps(frequencies.tile_checksums).encode()).hexdigest()
+
+
+class ReplayWriter:
+    """Append-only writer of the turn records of a single game"""
+
+    def __init__(self, path, header):
+        """
+            Args:
+                path (str): path of the replay file, overwritten if it exists
+                header (dict): description of the game, see TimingMazeGame.replay_header
+        """
+        header = dict(header, format=REPLAY_FORMAT, version=REPLAY_VERSION)
+        dtype = record_dtype(header["dims"])
+        header["record_dtype"] = dtype.descr
+        self.path = path
+        self.turns = 0
+        self._record = struct.Struct("<bB" + ("HH" if dtype["x"].itemsize == 2 else "II"))
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, "wb")
+        data = json.dumps(header).encode()
+        self._file.write(REPLAY_MAGIC + _HEADER_LENGTH.pack(len(data)) + data)
+
+    def record(self, action, accepted, pos):
+        """Append the record of a turn"""
+        if type(action) is not int or not constants.WAIT <= action <= constants.DOWN:
+            action = INVALID_ACTION
+        self._file.write(self._record.pack(action, bool(accepted), int(pos[0]), int(pos[1])))
+        self.turns += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class Replay:
+    """Read-only view of a replay file, indexed by turn"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(REPLAY_MAGIC)) != REPLAY_MAGIC:
+                raise ValueError("{} is not a replay".format(path))
+            header_length, = _HEADER_LENGTH.unpack(f.read(_HEADER_LENGTH.size))
+            self.header = json.loads(f.read(header_length))
+        if self.header.get("format") != REPLAY_FORMAT or self.header.get("version") != REPLAY_VERSION:
+            raise ValueError("{} is not a version {} replay".format(path, REPLAY_VERSION))
+        dtype = np.dtype([tuple(field) for field in self.header["record_dtype"]])
+        offset = len(REPLAY_MAGIC) + _HEADER_LENGTH.size + header_length
+        # A game cut short may leave a partial record at the end, which is ignored
+        self.turns = (os.path.getsize(path) - offset) // dtype.itemsize
+        if self.turns:
+            self.records = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(self.turns,))
+        else:
+            self.records = np.zeros(0, dtype=dtype)
+        self.start_pos = np.array(self.header["start_pos"])
+        self.end_pos = np.array(self.header["end_pos"])
+
+    def position(self, turn):
+        """Return the position of the drone at the end of turn, the start position for turn 0"""
+        if turn == 0:
+            return self.start_pos.copy()
+        record = self.records[turn - 1]
+        return np.array([int(record["x"]), int(record["y"])])
+
+    def action(self, turn):
+        """Return (action, accepted) of turn, counted from 1"""
+        record = self.records[turn - 1]
+        return int(record["action"]), bool(record["accepted"])
+
+    def load_maze(self, map_cache=None):
+        """Return the door frequencies of the game, loading its map or generating the maze again
+
+            Args:
+                map_cache (str): map cache directory to look the generated maze up in first
+        """
+        header = self.header
+        if header["maze"]:
+            start_pos, end_pos, frequencies = load_map(header["maze"])
+        else:
+            # Generate the maze the way the game did, from the same random number generator state
+            from timing_maze_game import TimingMazeGame
+            args = argparse.Namespace(max_door_frequency=header["max_door_frequency"], radius=header["radius"],
+                                      seed=header["seed"], maze=None, scale=9, no_gui=True, log_path="",
+                                      disable_logging=True, disable_timeout=True, player=None,
+                                      generator_version=header["generator_version"], map_cache=map_cache,
+                                      map_width=header["dims"][0], map_height=header["dims"][1],
+                                      tile_size=header["tile_size"])
+            game = TimingMazeGame(args, start=False)
+            game.maze_rng.bit_generator.state = header["rng_state"]
+            game.generate_random_maze()
+            start_pos, end_pos, frequencies = game.cur_pos, game.end_pos, game.map_frequencies
+        if (np.asarray(start_pos).tolist() != header["start_pos"] or np.asarray(end_pos).tolist() != header["end_pos"]
+                or (header["map_checksum"] is not None and maze_checksum(frequencies) != header["map_checksum"])):
+            raise ValueError("The maze of {} does not match the maze the game was played in".format(self.path))
+        return frequencies
+
+    def stats(self):
+        """Summary of the game"""
+        actions = self.records["action"]
+        accepted = self.records["accepted"].astype(bool)
+        positions = np.stack([self.records["x"], self.records["y"]], axis=1).astype(np.int64)
+        moves = (actions >= constants.LEFT) & accepted
+        return {
+            "player": self.header["player"],
+            "seed": self.header["seed"],
+            "max_door_frequency": self.header["max_door_frequency"],
+            "radius": self.header["radius"],
+            "dims": self.header["dims"],
+            "turns": int(self.turns),
+            "valid_moves": int(accepted.sum()),
+            "moves": int(moves.sum()),
+            "waits": int(((actions == constants.WAIT) & accepted).sum()),
+            "rejected_moves": int((~accepted).sum()),
+            "cells_visited": int(np.unique(np.vstack([self.start_pos[None], positions]), axis=0).shape[0]),
+            "goal_reached": bool(self.turns and (positions[-1] == self.end_pos).all()),
+        }
+
+
+class ReplayGame:
+    """Stand-in for a TimingMazeGame that plays a replay back, so MazeGui can show it with all its controls"""
+
+    def __init__(self, replay, frequencies, turn=0, scale=9):
+        """
+            Args:
+                replay (Replay): replay to play back
+                frequencies (Union[np.ndarray, TiledMap]): door frequencies, see Replay.load_maze
+                turn (int): turn to start from
+                scale (int): scale of the window
+        """
+        from game_config import GameConfig
+        self.replay = replay
+        self.config = GameConfig(replay.header["max_door_frequency"], replay.header["radius"], *replay.header["dims"])
+        self.radius = replay.header["radius"]
+        self.scale = scale
+        self.door_clock = DoorClock(frequencies)
+        self.start_pos = replay.start_pos
+        self.end_pos = replay.end_pos
+        self.gui = None
+        self.game_state = "pause"
+        self.seek(turn)
+
+    def seek(self, turn):
+        """Jump to the end of turn, in O(1)"""
+        self.turns = min(max(turn, 0), self.replay.turns)
+        self.cur_pos = self.replay.position(self.turns)
+
+    def play_turn(self):
+        # Advance by one recorded turn, returns True once the replay is over
+        if self.turns < self.replay.turns:
+            self.seek(self.turns + 1)
+        if self.gui is not None:
+            self.gui.turn_played()
+        if self.turns >= self.replay.turns:
+            self.game_state = "over"
+            return True
+        return False
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Inspect or replay a game from its replay file")
+    parser.add_argument("replay", help="Replay file written with --replay")
+    parser.add_argument("--turn", "-t", type=int, default=None, help="Turn to show, the last turn if not given")
+    parser.add_argument("--stats", nargs="?", const="-", help="Export the stats of the game as JSON, to stdout or "
+                                                              "to the given path")
+    parser.add_argument("--gui", action="store_true", help="Play the replay back in the GUI from the turn")
+    parser.add_argument("--map_cache", "-mc", help="Map cache to look a generated maze up in before generating it")
+    parser.add_argument("--frame_rate", "-fr", type=int, help="Redraws per second at Max speed in the GUI")
+    args = parser.parse_args()
+
+    replay = Replay(args.replay)
+    turn = replay.turns if args.turn is None else min(max(args.turn, 0), replay.turns)
+    if args.stats:
+        stats = replay.stats()
+        if args.stats == "-":
+            print(json.dumps(stats, indent=4))
+        else:
+            with open(args.stats, "w") as f:
+                json.dump(stats, f, indent=4)
+
+    if args.gui or not args.stats:
+        frequencies = replay.load_maze(args.map_cache)
+    if args.gui:
+        from maze_gui import MazeGui
+        game = ReplayGame(replay, frequencies, turn)
+        game.gui = MazeGui(game, frame_rate=args.frame_rate)
+        game.gui.run()
+    elif not args.stats:
+        door_clock = DoorClock(frequencies)
+        open_bits = door_clock.open_bits(max(turn, 1))
+        print("Turn {} of {}".format(turn, replay.turns))
+        if turn:
+            action, accepted = replay.action(turn)
+            print("Action {} {}".format(action, "accepted" if accepted else "rejected"))
+        pos = replay.position(turn)
+        print("Position {}, open doors of the cell: {}".format(
+            pos.tolist(), [door for door in range(4) if open_bits[pos[0], pos[1]] >> door & 1]))
+        print("Open doors in the maze: {}".format(int(np.unpackbits(open_bits).sum())))
@@ -1,8 +1,4 @@
 from timing_maze_game import TimingMazeGame
-import tkinter as tk
-import sys
-
-sys.setrecursionlimit(10000)
 
 class Namespace:
     def __init__(self, **kwargs):
@@ -25,5 +21,4 @@ if __name__ == "__main__":
         }
     )
 
-    root = tk.Tk()
-    app = TimingMazeGame(args, root)
+    app = TimingMazeGame(args)
@@ -1,17 +1,46 @@
 import argparse
+import hashlib
 import os
 import json
 import time
 import numpy as np
+import constants
 from timing_maze_game_simulation import TimingMazeGame
+from map_cache import DEFAULT_MAP_CACHE_DIR
+from maze_solver import solve_sighting, competitive_ratio
 from collections import defaultdict
-import tkinter as tk
-import sys
-
-sys.setrecursionlimit(1000000)
 output_dir = "vm2_simulation_results"
 
 
+def optimal_turns(game, solved):
+    """Return the fewest turns the game can be played in, solving each maze and radius once
+
+    The simulation engine ends a game as soon as the end is in view of the drone, so the optimum is the fewest turns
+    to see the end, see maze_solver.solve_sighting.
+
+    Args:
+        game (TimingMazeGame): game whose maze was loaded
+        solved (dict): optimal turns of the mazes solved so far, keyed by their content
+    """
+    if game.map_frequencies is None:
+        return None
+    key = (
+        game.radius,
+        tuple(int(v) for v in game.start_pos),
+        tuple(int(v) for v in game.end_pos),
+        hashlib.sha1(np.ascontiguousarray(game.map_frequencies).tobytes()).hexdigest(),
+    )
+    if key not in solved:
+        solved[key] = solve_sighting(
+            game.map_frequencies,
+            game.start_pos,
+            game.end_pos,
+            game.radius,
+            schedule=game.edge_schedule,
+        )
+    return solved[key]
+
+
 def run_simulation(
     max_door_frequencies,
     radii,
@@ -23,9 +52,16 @@ def run_simulation(
     direction_vector_max_weights,
     direction_vector_multipliers,
     direction_vector_pov_radii,
+    profile=None,
+    profile_every=1,
+    profile_turns=None,
+    player_host=False,
+    turn_timeout=None,
 ):
     results = []
     summary = []
+    # The same maze is played with every player setting, so each maze is solved once
+    solved = {}
 
     for max_door_frequency in max_door_frequencies:
         for radius in radii:
@@ -53,11 +89,18 @@ def run_simulation(
                                                 radius=radius,
                                                 seed=seed,
                                                 maze=None,
+                                                map_cache=DEFAULT_MAP_CACHE_DIR,
                                                 scale=9,
                                                 no_gui=True,
                                                 log_path=f"logs/mdf{max_door_frequency}_r{radius}_s{seed}.log",
                                                 disable_logging=False,
-                                                disable_timeout=True,
+                                                # Every player has the total time budget. Without a turn limit
+                                                # its moves are not interrupted, the player stops moving once it
+                                                # has used the budget up. With one the watchdog cancels the moves
+                                                # over either limit
+                                                timeout=constants.timeout,
+                                                disable_timeout=turn_timeout is None,
+                                                turn_timeout=turn_timeout,
                                                 player="1",
                                                 wait_penalty=wait_penalty,
                                                 wait_max_penalty=wait_max_penalty,
@@ -66,16 +109,39 @@ def run_simulation(
                                                 direction_vector_max_weight=direction_vector_max_weight,
                                                 direction_vector_multiplier=direction_vector_multiplier,
                                                 direction_vector_pov_radius=direction_vector_pov_radius,
+                                                replay=os.path.join(
+                                                    output_dir,
+                                                    "replays",
+                                                    f"game_{len(results)}.tmr",
+                                                ),
+                                                time_phases=True,
+                                                # Every profile_every-th game is profiled, next to its logs
+                                                profile=(
+                                                    profile
+                                                    if len(results) % profile_every == 0
+                                                    else None
+                                                ),
+                                                profile_path=os.path.join(
+                                                    f"logs/mdf{max_door_frequency}_r{radius}_s{seed}.log",
+                                                    f"profile_game_{len(results)}",
+                                                ),
+                                                profile_turns=profile_turns,
+                                                player_host=player_host,
                                             )
 
-                                            root = tk.Tk()
-                                            game = TimingMazeGame(args, root)
+                                            game = TimingMazeGame(args)
 
                                             start_time = time.time()
                                             try:
                                                 game.initialize(None)
                                             finally:
                                                 end_time = time.time()
+                                                goal_reached = (
+                                                    game.cur_pos[0] == game.end_pos[0]
+                                                    and game.cur_pos[1]
+                                                    == game.end_pos[1]
+                                                )
+                                                optimal = optimal_turns(game, solved)
                                                 result = {
                                                     "max_door_frequency": max_door_frequency,
                                                     "radius": radius,
@@ -90,12 +156,31 @@ def run_simulation(
                                                     "turns": game.turns,
                                                     "valid_moves": game.valid_moves,
                                                     "time_taken": end_time - start_time,
-                                                    "goal_reached": game.cur_pos[0]
-                                                    == game.end_pos[0]
-                                                    and game.cur_pos[1]
-                                                    == game.end_pos[1],
+                                                    "goal_reached": goal_reached,
                                                     "is_end_visible": game.is_end_visible,
+                                                    "maze_repairs": game.maze_repairs,
+                                                    "replay": args.replay,
+                                                    "optimal_turns": optimal,
+                                                    # Games end once the end is in view, see
+                                                    # optimal_turns
+                                                    "competitive_ratio": competitive_ratio(
+                                                        game.turns,
+                                                        optimal,
+                                                        goal_reached or game.is_end_visible,
+                                                    ),
+                                                    # p50/p95/p99/max of every phase of the turns in microseconds
+                                                    "phase_times": game.timers.histograms(),
+                                                    # Profile path and engine and player time of profiled games
+                                                    "profile": game.profile_summary,
+                                                    "timeouts": game.timeouts,
+                                                    # Round trip of the moves of a hosted player
+                                                    "player_latency": (
+                                                        game.player.latency()
+                                                        if player_host
+                                                        else None
+                                                    ),
                                                 }
+                                                game.close()
                                                 # Convert tuple to string for JSON compatibility
                                                 results.append(result)
 
@@ -115,10 +200,15 @@ def run_simulation(
                                                         "direction_vector_max_weight": direction_vector_max_weight,
                                                         "direction_vector_multiplier": direction_vector_multiplier,
                                                         "direction_vector_pov_radius": direction_vector_pov_radius,
+                                                        "optimal_turns": optimal,
+                                                        "competitive_ratio": result[
+                                                            "competitive_ratio"
+                                                        ],
                                                     }
                                                 )
                                     save_results(results, output_dir)
                                     save_summary(summary, output_dir)
+                                    save_competitive_ratios(summary, output_dir)
 
     return results, summary
 
@@ -142,14 +232,77 @@ def save_summary(summary, output_dir):
     output_file = os.path.join(output_dir, "simulation_summary.csv")
     with open(output_file, "w") as f:
         f.write(
-            "max_door_frequency,radius,seed,turns,goal_reached,wait_penalty,wait_max_penalty,revisit_penalty,revisit_max_penalty,direction_vector_max_weight,direction_vector_multiplier,direction_vector_pov\n"
+            "max_door_frequency,radius,seed,turns,goal_reached,wait_penalty,wait_max_penalty,revisit_penalty,revisit_max_penalty,direction_vector_max_weight,direction_vector_multiplier,direction_vector_pov,optimal_turns,competitive_ratio\n"
         )
         for entry in summary:
             f.write(
-                f"{entry['max_door_frequency']},{entry['radius']},{entry['seed']},{entry['turns']},{entry['goal_reached']},{entry['wait_penalty']},{entry['wait_max_penalty']},{entry['revisit_penalty']},{entry['revisit_max_penalty']},{entry['direction_vector_max_weight']},{entry['direction_vector_multiplier']},{entry['direction_vector_pov_radius']}\n"
+                f"{entry['max_door_frequency']},{entry['radius']},{entry['seed']},{entry['turns']},{entry['goal_reached']},{entry['wait_penalty']},{entry['wait_max_penalty']},{entry['revisit_penalty']},{entry['revisit_max_penalty']},{entry['direction_vector_max_weight']},{entry['direction_vector_multiplier']},{entry['direction_vector_pov_radius']},{format_optional(entry['optimal_turns'])},{format_optional(entry['competitive_ratio'])}\n"
             )
 
 
+CONFIG_KEYS = (
+    "max_door_frequency",
+    "radius",
+    "wait_penalty",
+    "wait_max_penalty",
+    "revisit_penalty",
+    "revisit_max_penalty",
+    "direction_vector_max_weight",
+    "direction_vector_multiplier",
+    "direction_vector_pov_radius",
+)
+
+
+def format_optional(value):
+    # Empty CSV field for values that are not available, such as the ratio of games that
+    # ran out of turns before seeing the end
+    return "" if value is None else value
+
+
+def competitive_ratios_by_config(summary):
+    """Return the competitive ratio of every config over the games that saw the end
+
+    The ratio of a config is its total number of turns over the total optimal number of
+    turns of the same games, so longer mazes weigh more than with a mean of the ratios.
+    """
+    totals = defaultdict(lambda: [0, 0, 0, 0])
+    for entry in summary:
+        config = tuple(entry[key] for key in CONFIG_KEYS)
+        total = totals[config]
+        total[0] += 1
+        if entry["competitive_ratio"] is not None:
+            total[1] += 1
+            total[2] += entry["turns"]
+            total[3] += entry["optimal_turns"]
+    return {
+        config: {
+            "games": games,
+            "finished": finished,
+            "competitive_ratio": turns / optimal if optimal else None,
+        }
+        for config, (games, finished, turns, optimal) in totals.items()
+    }
+
+
+def save_competitive_ratios(summary, output_dir):
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    output_file = os.path.join(output_dir, "competitive_ratios.csv")
+    with open(output_file, "w") as f:
+        f.write(",".join(CONFIG_KEYS) + ",games,finished,competitive_ratio\n")
+        ratios = competitive_ratios_by_config(summary)
+        for config, ratio in ratios.items():
+            f.write(
+                ",".join(str(value) for value in config)
+                + f",{ratio['games']},{ratio['finished']},{format_optional(ratio['competitive_ratio'])}\n"
+            )
+    if summary and all(ratio["competitive_ratio"] is None for ratio in ratios.values()):
+        print(
+            "Warning: no game saw the end within its turns, competitive_ratios.csv has no ratio"
+        )
+
+
 def convert_numpy_types(data):
     if isinstance(data, np.bool_):
         return bool(data)
@@ -165,6 +318,35 @@ def convert_numpy_types(data):
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Sweep the player parameters of g1")
+    parser.add_argument(
+        "--profile",
+        choices=constants.profilers,
+        help="Profile the games and write the profiles next to their logs, see game_profiler.py",
+    )
+    parser.add_argument(
+        "--profile_every",
+        type=int,
+        default=1,
+        help="Only profile every this many games",
+    )
+    parser.add_argument(
+        "--profile_turns",
+        help="Turns to profile, as 100-200, 500- or 42, every turn if not given",
+    )
+    parser.add_argument(
+        "--player_host",
+        action="store_true",
+        help="Run the player in a worker process and record the round trip of its moves, "
+        "the player gets its own rng so its draws differ from an in-process run",
+    )
+    parser.add_argument(
+        "--turn_timeout",
+        type=float,
+        help="Seconds the player may take for a move, no limit if not given",
+    )
+    args = parser.parse_args()
+
     max_door_frequencies = [20]
     radii = [5, 20, 40]
     num_maps_per_config = 3
@@ -187,9 +369,15 @@ def main():
         direction_vector_max_weights,
         direction_vector_multipliers,
         direction_vector_pov_radii,
+        profile=args.profile,
+        profile_every=args.profile_every,
+        profile_turns=args.profile_turns,
+        player_host=args.player_host,
+        turn_timeout=args.turn_timeout,
     )
     save_results(results, output_dir)
     save_summary(summary, output_dir)
+    save_competitive_ratios(summary, output_dir)
     print(f"Simulation complete")
 
 
@@ -0,0 +1,226 @@
+"""Tiled storage for the door frequencies of huge mazes.
+
+The frequencies are cut into tile_size x tile_size tiles stored one after the other in a uint8 .npy array of shape
+(tiles_x, tiles_y, tile_size, tile_size, 4), so every tile is a contiguous block of the file. Tiles on the right and
+bottom edges are padded with zeros. Tiles are read and written one at a time at their offset in the file rather than
+through a memory map, whose pages would count towards the memory of the game as the maze is streamed. Only the tiles
+that are asked for are read, and a small LRU of resident tiles serves the drone and move checks, so memory scales
+with the radius of the drone instead of the area of the maze. The header of a tiled map is written by map_io.
+"""
+import zlib
+from collections import OrderedDict
+import numpy as np
+
+DEFAULT_TILE_SIZE = 256
+DEFAULT_RESIDENT_TILES = 64
+TILE_DTYPE = np.uint8
+
+
+def tile_grid(dims, tile_size):
+    """Return the number of tiles along x and y for a maze of the given (width, height)"""
+    width, height = dims
+    return -(-width // tile_size), -(-height // tile_size)
+
+
+def tile_bounds(dims, tile_size):
+    """Yield (tx, ty, x0, x1, y0, y1) for every tile, with the cells it covers along x and y, in file order"""
+    width, height = dims
+    tiles_x, tiles_y = tile_grid(dims, tile_size)
+    for tx in range(tiles_x):
+        for ty in range(tiles_y):
+            x0, y0 = tx * tile_size, ty * tile_size
+            yield tx, ty, x0, min(x0 + tile_size, width), y0, min(y0 + tile_size, height)
+
+
+def tile_checksum(tile):
+    """crc32 of a tile as stored in the file, cheap enough to check whenever a tile is read"""
+    return zlib.crc32(np.ascontiguousarray(tile, dtype=TILE_DTYPE).tobytes())
+
+
+class TileFile:
+    """A (tiles_x, tiles_y, T, T, 4) .npy tile array on disk, read and written one tile at a time"""
+
+    def __init__(self, path, mode="rb"):
+        self.path = path
+        self._file = open(path, mode)
+        if np.lib.format.read_magic(self._file) == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(self._file)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(self._file)
+        if len(shape) != 5 or shape[2] != shape[3] or shape[4] != 4 or fortran_order or dtype != TILE_DTYPE:
+            raise ValueError("{} is not a tile file".format(path))
+        self.shape = shape
+        self.tile_size = shape[2]
+        self._data_offset = self._file.tell()
+        self._tile_bytes = self.tile_size * self.tile_size * 4
+
+    def _seek(self, tx, ty):
+        self._file.seek(self._data_offset + (tx * self.shape[1] + ty) * self._tile_bytes)
+
+    def read(self, tx, ty):
+        """Return the padded (T, T, 4) tile"""
+        self._seek(tx, ty)
+        tile = np.frombuffer(self._file.read(self._tile_bytes), dtype=TILE_DTYPE)
+        return tile.reshape(self.tile_size, self.tile_size, 4).copy()
+
+    def write(self, tx, ty, tile):
+        """Write a tile, a tile smaller than (T, T, 4) is padded with zeros"""
+        padded = np.zeros((self.tile_size, self.tile_size, 4), dtype=TILE_DTYPE)
+        padded[:tile.shape[0], :tile.shape[1]] = tile
+        self._seek(tx, ty)
+        self._file.write(padded.tobytes())
+
+    def close(self):
+        self._file.close()
+
+
+def create_tiles(path, dims, tile_size):
+    """Create a zeroed tile file and return it open for writing as a TileFile"""
+    tiles_x, tiles_y = tile_grid(dims, tile_size)
+    shape = (tiles_x, tiles_y, tile_size, tile_size, 4)
+    with open(path, "wb") as f:
+        np.lib.format.write_array_header_1_0(f, {"descr": np.lib.format.dtype_to_descr(np.dtype(TILE_DTYPE)),
+                                                 "fortran_order": False, "shape": shape})
+        # Leave the tiles sparse until they are written
+        f.truncate(f.tell() + tiles_x * tiles_y * tile_size * tile_size * 4)
+    return TileFile(path, "r+b")
+
+
+class TiledMap:
+    """Read-only door frequencies backed by a tile file, indexed like a (width, height, 4) array
+
+    Integer and slice indexing, shape, size, dtype and max() behave as they do for the dense array, so the door
+    clock, the drone and the move checks read a tiled map through the same interface. Indexing a region only reads
+    the tiles it overlaps.
+    """
+
+    def __init__(self, path, dims, tile_size, max_frequency, tile_checksums=None,
+                 max_resident_tiles=DEFAULT_RESIDENT_TILES):
+        """
+            Args:
+                path (str): path of the tile file
+                dims (Tuple[int, int]): (width, height) of the maze
+                tile_size (int): side of a tile
+                max_frequency (int): largest door frequency of the maze
+                tile_checksums (List[List[int]]): crc32 of every tile, checked when a tile is read if given
+                max_resident_tiles (int): number of tiles kept in memory, least recently used tiles are dropped
+        """
+        self.path = path
+        self.dims = tuple(dims)
+        self.tile_size = tile_size
+        self.max_frequency = max_frequency
+        self.tile_checksums = tile_checksums
+        self.max_resident_tiles = max_resident_tiles
+        self._tiles = TileFile(path)
+        if self._tiles.shape != tile_grid(self.dims, tile_size) + (tile_size, tile_size, 4):
+            raise ValueError("Tile file {} has shape {}, expected {} tiles of {}x{}".format(
+                path, self._tiles.shape, tile_grid(self.dims, tile_size), tile_size, tile_size))
+        self._resident = OrderedDict()
+        self.tiles_read = 0
+
+    @property
+    def shape(self):
+        return self.dims + (4,)
+
+    @property
+    def size(self):
+        return self.dims[0] * self.dims[1] * 4
+
+    @property
+    def ndim(self):
+        return 3
+
+    @property
+    def dtype(self):
+        return np.dtype(TILE_DTYPE)
+
+    def max(self):
+        return self.max_frequency
+
+    def read_tile(self, tx, ty):
+        """Read a tile from the file, trimmed to the cells of the maze, without keeping it resident"""
+        tile = self._tiles.read(tx, ty)
+        self.tiles_read += 1
+        if self.tile_checksums is not None and tile_checksum(tile) != self.tile_checksums[tx][ty]:
+            raise ValueError("Tile ({}, {}) of {} does not match its checksum".format(tx, ty, self.path))
+        tile = tile[:min(self.tile_size, self.dims[0] - tx * self.tile_size),
+                    :min(self.tile_size, self.dims[1] - ty * self.tile_size)]
+        tile.setflags(write=False)
+        return tile
+
+    def tile(self, tx, ty):
+        """Return a tile through the LRU of resident tiles"""
+        key = (tx, ty)
+        tile = self._resident.get(key)
+        if tile is None:
+            tile = self.read_tile(tx, ty)
+            self._resident[key] = tile
+            if len(self._resident) > self.max_resident_tiles:
+                self._resident.popitem(last=False)
+        else:
+            self._resident.move_to_end(key)
+        return tile
+
+    @property
+    def resident_tiles(self):
+        return len(self._resident)
+
+    def iter_tiles(self):
+        """Yield (x0, y0, tile) for every tile in file order, streaming past the LRU of resident tiles"""
+        for tx, ty, x0, x1, y0, y1 in tile_bounds(self.dims, self.tile_size):
+            yield x0, y0, self.read_tile(tx, ty)
+
+    def region(self, x0, x1, y0, y1):
+        """Return the frequencies of the cells [x0, x1) x [y0, y1) as a dense (x1 - x0, y1 - y0, 4) array"""
+        region = np.zeros((max(x1 - x0, 0), max(y1 - y0, 0), 4), dtype=TILE_DTYPE)
+        size = self.tile_size
+        for tx in range(x0 // size, -(-x1 // size)):
+            for ty in range(y0 // size, -(-y1 // size)):
+                tile = self.tile(tx, ty)
+                tile_x0, tile_y0 = tx * size, ty * size
+                ax0, ax1 = max(x0, tile_x0), min(x1, tile_x0 + tile.shape[0])
+                ay0, ay1 = max(y0, tile_y0), min(y1, tile_y0 + tile.shape[1])
+                region[ax0 - x0:ax1 - x0, ay0 - y0:ay1 - y0] = tile[ax0 - tile_x0:ax1 - tile_x0,
+                                                                    ay0 - tile_y0:ay1 - tile_y0]
+        return region
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if len(key) > 3:
+            raise IndexError("too many indices for a tiled map")
+        # Turn the x and y indices into ranges, integers drop their axis like they do for arrays
+        bounds = []
+        squeeze = []
+        for axis, index in enumerate(key[:2]):
+            length = self.dims[axis]
+            if isinstance(index, slice):
+                start, stop, step = index.indices(length)
+                if step != 1:
+                    raise IndexError("tiled maps only support contiguous slices")
+                bounds.append((start, max(start, stop)))
+            else:
+                index = int(index)
+                if index < 0:
+                    index += length
+                if not 0 <= index < length:
+                    raise IndexError("index {} is out of bounds for axis {} with size {}".format(index, axis, length))
+                bounds.append((index, index + 1))
+                squeeze.append(axis)
+        while len(bounds) < 2:
+            bounds.append((0, self.dims[len(bounds)]))
+
+        region = self.region(bounds[0][0], bounds[0][1], bounds[1][0], bounds[1][1])
+        if squeeze:
+            region = region.reshape(tuple(n for axis, n in enumerate(region.shape) if axis not in squeeze))
+        if len(key) == 3:
+            region = region[..., key[2]]
+        return region
+
+    def close(self):
+        self._tiles.close()
+        self._resident.clear()
+
+    def __repr__(self):
+        return "TiledMap({!r}, dims={}, tile_size={}, resident_tiles={})".format(
+            self.path, self.dims, self.tile_size, self.resident_tiles)
@@ -1,24 +1,31 @@
-import json
 import os
 import time
-import signal
 import numpy as np
-import math
 from timing_maze_state import TimingMazeState
+from door_clock import DoorClock, EdgeSchedule
+from drone_visibility import drone_visual, visible_window
+from maze_generator import generate_maze, generate_tiled_maze, LATEST_GENERATOR_VERSION
+from maze_validator import validate_maze
+from map_io import load_map, save_map
+from game_config import GameConfig
+from game_logging import GameLogs, TURN, TURN_MESSAGE, turn_record
+from turn_timers import TurnTimers
 from constants import *
 import constants
 from utils import *
-from players.default_player import Player as DefaultPlayer
-from players.g1_player import Player as G1_Player
-from collections import deque as queue
-import tkinter as tk
 
 class TimingMazeGame:
     # Direction vectors
     dRow = [-1, 0, 1, 0]
     dCol = [0, -1, 0, 1]
 
-    def __init__(self, args, root):
+    def __init__(self, args, root=None, start=True):
+        """
+            Args:
+                args: game options, see main.py
+                root (tk.Tk): tkinter root window of the GUI, created when the GUI starts if not given
+                start (bool): play the game right away, otherwise the game is driven through reset() and step()
+        """
         self.cur_pos = None
         self.end_pos = None
         self.start_pos = None
@@ -27,39 +34,46 @@ class TimingMazeGame:
         self.do_logging = not args.disable_logging
         self.is_paused = False
         self.root = root
+        self.gui = None
         self.game_state = "pause"
-        self.game_speed = "normal"
         self.scale = int(args.scale)
+        self.frame_rate = getattr(args, "frame_rate", None)
+        self.render_every = getattr(args, "render_every", None)
 
         if self.use_gui:
-            self.grid_width = constants.map_dim * constants.CELL_SIZE
-            self.grid_height = constants.map_dim * constants.CELL_SIZE
-            self.canvas_width = 155 * self.scale
-            self.canvas_height = 100 * self.scale
-            self.x_offset = (self.canvas_width - self.grid_width) // 2
-            self.y_offset = (self.canvas_height - self.grid_height) // 4
             self.use_timeout = False
         else:
             self.use_timeout = not args.disable_timeout
+        # The watchdog is only imported, and its thread started, when the player has time limits
+        self.watchdog = None
+        if self.use_timeout:
+            from player_watchdog import WATCHDOG
+            self.watchdog = WATCHDOG
 
         self.logger = logging.getLogger(__name__)
-        # create file handler which logs even debug messages
+        # The file handlers are written by a background thread, see game_logging.py
+        self.logs = None
+        # create file handler which logs even debug messages, and the records of every turn with log_turns
         if self.do_logging:
-            self.logger.setLevel(logging.DEBUG)
+            debug_level = TURN if getattr(args, "log_turns", False) else logging.DEBUG
+            self.logger.setLevel(debug_level)
             self.log_dir = args.log_path
             if self.log_dir:
                 os.makedirs(self.log_dir, exist_ok=True)
+            self.logs = GameLogs(self.logger)
             fh = logging.FileHandler(os.path.join(self.log_dir, 'debug.log'), mode="w")
-            fh.setLevel(logging.DEBUG)
+            fh.setLevel(debug_level)
             fh.setFormatter(logging.Formatter('%(message)s'))
             fh.addFilter(MainLoggingFilter(__name__))
-            self.logger.addHandler(fh)
+            self.logs.add_handler(fh)
             result_path = os.path.join(self.log_dir, "results.log")
             rfh = logging.FileHandler(result_path, mode="w")
             rfh.setLevel(logging.INFO)
             rfh.setFormatter(logging.Formatter('%(message)s'))
             rfh.addFilter(MainLoggingFilter(__name__))
-            self.logger.addHandler(rfh)
+            self.logs.add_handler(rfh)
+            if debug_level == TURN:
+                self.logs.add_turn_records(os.path.join(self.log_dir, "turns.jsonl"))
         else:
             if args.log_path:
                 self.logger.setLevel(logging.INFO)
@@ -67,11 +81,12 @@ class TimingMazeGame:
                 self.log_dir = os.path.dirname(result_path)
                 if self.log_dir:
                     os.makedirs(self.log_dir, exist_ok=True)
+                self.logs = GameLogs(self.logger)
                 rfh = logging.FileHandler(result_path, mode="w")
                 rfh.setLevel(logging.INFO)
                 rfh.setFormatter(logging.Formatter('%(message)s'))
                 rfh.addFilter(MainLoggingFilter(__name__))
-                self.logger.addHandler(rfh)
+                self.logs.add_handler(rfh)
             else:
                 self.logger.setLevel(logging.ERROR)
                 self.logger.disabled = True
@@ -79,55 +94,104 @@ class TimingMazeGame:
         self.logger.info("Initialise random number generator with seed {}".format(args.seed))
 
         self.rng = np.random.default_rng(args.seed)
+        # Mazes are drawn from a generator of their own with the same seed, so the random numbers a player draws when it
+        # is initialised change neither the maze nor its map cache key
+        self.maze_rng = np.random.default_rng(args.seed)
 
         self.player = None
         self.player_name = None
-        self.player_time = constants.timeout
+        # Time limits of the player in seconds, for all its moves together and for a single move, enforced in any
+        # thread by the watchdog, see player_watchdog.py
+        self.total_timeout = getattr(args, "timeout", None) or constants.timeout
+        self.turn_timeout = getattr(args, "turn_timeout", None)
+        self.player_time = self.total_timeout
         self.player_timeout = False
+        # Every time limit the player ran out of, see record_timeout
+        self.timeouts = []
+        self.array_percept = False
 
+        self.config = GameConfig.from_args(args)
         self.max_door_frequency = args.max_door_frequency
         self.radius = args.radius
+        self.generator_version = getattr(args, "generator_version", None) or LATEST_GENERATOR_VERSION
+        self.maze_repairs = 0
+        self.seed = args.seed
+        self.map_cache = None
+        if getattr(args, "map_cache", None):
+            from map_cache import MapCache, DEFAULT_MAP_CACHE_SIZE
+            self.map_cache = MapCache(args.map_cache, (getattr(args, "map_cache_size", None) or
+                                                       DEFAULT_MAP_CACHE_SIZE // 2 ** 20) * 2 ** 20)
         self.goal_reached = False
         self.turns = 0
-        self.max_turns = 1e10
+        self.max_turns = args.turns if getattr(args, "turns", None) else 1e10
         self.valid_moves = 0
-        self.map_state = np.zeros((constants.map_dim, constants.map_dim, 4), dtype=int)
-        self.map_frequencies = np.zeros((constants.map_dim, constants.map_dim, 4), dtype=int)
-
-        self.add_player(args.player)
-        self.initialize(args.maze)
+        self.move_accepted = False
+        self.drone_visual_time = 0.0
+        self.player_time_taken = 0.0
+        # Per-phase timers of the turns, only kept when asked for
+        self.timers = TurnTimers() if getattr(args, "time_phases", False) else None
+        self.current_percept = None
+        self.door_clock = None
+        self._edge_schedule = None
+        self.map_frequencies = None
+        self.tile_dir = None
+        self.maze_path = None
+        self.maze_rng_state = None
+        self.replay_path = getattr(args, "replay", None)
+        self.replay = None
+        # Run the player in a worker process instead of calling it in the engine's process
+        self.player_host = getattr(args, "player_host", False)
+
+        if args.player is not None:
+            self.add_player(args.player)
+
+        # Profile of the selected turns, written next to the logs when the game is over
+        self.profiler = None
+        self.profile_summary = None
+        if getattr(args, "profile", None):
+            # Only imported when profiling, like maze_gui for the GUI
+            from game_profiler import GameProfiler
+            profile_path = getattr(args, "profile_path", None) or os.path.join(getattr(self, "log_dir", ""), "profile")
+            self.profiler = GameProfiler.create(args.profile, profile_path, self.player,
+                                                getattr(args, "profile_turns", None))
+        if start:
+            self.initialize(args.maze)
 
     def add_player(self, player_in):
-        if player_in in constants.possible_players:
-            if player_in.lower() == 'd':
-                player_class = DefaultPlayer
-                player_name = "Default Player"
-            else:
-                player_class = eval("G{}_Player".format(player_in))
-                player_name = "Group {}".format(player_in)
+        # Only the module of the selected player is imported, see player_registry.py
+        from player_registry import find_player, load_player
+        found = find_player(player_in)
+        if found is not None:
+            player_name, player_reference = found
 
             self.logger.info(
-                "Adding player {} from class {}".format(player_name, player_class.__module__))
+                "Adding player {} from class {}".format(player_name, player_reference))
             precomp_dir = os.path.join("precomp", player_name)
             os.makedirs(precomp_dir, exist_ok=True)
 
             start_time = 0
             is_timeout = False
-            if self.use_timeout:
-                signal.signal(signal.SIGALRM, timeout_handler)
-                signal.alarm(constants.timeout)
+            budget = self.total_timeout if self.use_timeout else None
             try:
                 start_time = time.time()
-                player = player_class(rng=self.rng, logger=self.get_player_logger(player_name),
-                                      precomp_dir=precomp_dir, maximum_door_frequency=self.max_door_frequency,
-                                      radius=self.radius)
-                if self.use_timeout:
-                    signal.alarm(0)  # Clear alarm
+                player_args = dict(rng=self.rng, logger=self.get_player_logger(player_name), precomp_dir=precomp_dir,
+                                   maximum_door_frequency=self.max_door_frequency, radius=self.radius)
+                if self.player_host:
+                    # Only imported for hosted players, it loads multiprocessing
+                    from player_host import PlayerHost
+                    # The worker imports the player, the engine never does
+                    player = PlayerHost(player_reference, timeout=budget, **player_args)
+                else:
+                    player_class = load_player(player_reference)
+                    player = (player_class(**player_args) if budget is None else
+                              self.watchdog.call(budget, player_class, **player_args))
             except TimeoutException:
                 is_timeout = True
                 player = None
+                self.player_timeout = True
+                self.record_timeout("init", budget, time.time() - start_time)
                 self.logger.error(
-                    "Initialization Timeout {} since {:.3f}s reached.".format(player_name, constants.timeout))
+                    "Initialization Timeout {} since {:.3f}s reached.".format(player_name, budget))
 
             init_time = time.time() - start_time
 
@@ -135,6 +199,8 @@ class TimingMazeGame:
                 self.logger.info("Initializing player {} took {:.3f}s".format(player_name, init_time))
             self.player = player
             self.player_name = player_name
+            # Players opt into the array percept with an array_percept class attribute
+            self.array_percept = getattr(player, "array_percept", False)
 
         else:
             self.logger.error("Failed to insert player {} since invalid player name provided.".format(player_in))
@@ -149,7 +215,7 @@ class TimingMazeGame:
             player_fh.setLevel(logging.DEBUG)
             player_fh.setFormatter(logging.Formatter('%(message)s'))
             player_fh.addFilter(PlayerLoggingFilter(player_name))
-            self.logger.addHandler(player_fh)
+            self.logs.add_handler(player_fh)
         else:
             player_logger.setLevel(logging.ERROR)
             player_logger.disabled = True
@@ -157,564 +223,463 @@ class TimingMazeGame:
         return player_logger
 
     def initialize(self, maze):
+        self.load_maze(maze)
+        self.start_replay()
+
+        if self.use_gui:
+            # tkinter is only imported when the GUI is requested, headless games never load it
+            from maze_gui import MazeGui
+            self.gui = MazeGui(self, self.root, self.frame_rate, self.render_every)
+            self.gui.run()
+        else:
+            self.play_game()
+
+    def load_maze(self, maze):
         # If maze is provided, load it in map_frequencies.
+        self.maze_path = maze
+        self.maze_rng_state = None
         if maze:
             self.logger.info("Loading maze from {}".format(maze))
-            with open(maze, "r") as f:
-                maze_obj = json.load(f)
-            self.cur_pos = np.array(maze_obj["start_pos"])
+            # JSON and binary (.npy) maps are both accepted, binary maps are memory-mapped
+            self.cur_pos, self.end_pos, self.map_frequencies = load_map(maze)
             self.start_pos = self.cur_pos.copy()
-            self.end_pos = np.array(maze_obj["end_pos"])
-            self.map_frequencies = np.array(maze_obj["frequencies"])
+            # The map decides the size of the maze
+            if self.map_frequencies.shape[:2] != self.config.dims:
+                self.logger.info("Using the {}x{} size of the map".format(*self.map_frequencies.shape[:2]))
+                self.config.dims = self.map_frequencies.shape[:2]
 
             # Validate the map
             if not self.validate_maze():
                 self.logger.error("Maze is invalid")
                 raise Exception("Invalid Map")
         else:
-            # If no map is provided, generate a random maze using the seed provided
-            # Generate a frequency for each cell between 0 and max_door_frequency using the rng
-            # self.logger.info("Generating random maze using seed {}".format(self.rng.bit_generator.seed))
-            while 1:
-                self.cur_pos = np.array([self.rng.integers(0, constants.map_dim),
-                                         self.rng.integers(0, constants.map_dim)])
-                self.start_pos = self.cur_pos.copy()
-                while 1:
-                    self.end_pos = np.array([self.rng.integers(0, constants.map_dim),
-                                             self.rng.integers(0, constants.map_dim)])
-                    if self.end_pos[0] != self.cur_pos[0] and self.end_pos[1] != self.cur_pos[1]:
-                        break
-
-                # Generate a random map
-                for i in range(constants.map_dim):
-                    for j in range(constants.map_dim):
-                        for k in range(4):
-                            if self.rng.random() < constants.CLOSED_PROB:
-                                self.map_frequencies[i][j][k] = 0
-                            else:
-                                self.map_frequencies[i][j][k] = self.rng.integers(1, self.max_door_frequency)
-
-                # Assign n=0 to all boundary doors
-                for i in range (constants.map_dim):
-                    self.map_frequencies[0][i][constants.LEFT] = 0
-                    self.map_frequencies[constants.map_dim-1][i][constants.RIGHT] = 0
-                    self.map_frequencies[i][0][constants.UP] = 0
-                    self.map_frequencies[i][constants.map_dim-1][constants.DOWN] = 0
-
-                if self.validate_maze():
-                    break
-
-                print("Retrying to generate a valid maze...")
+            # Kept so a replay can generate the same maze again
+            self.maze_rng_state = self.maze_rng.bit_generator.state
+            self.generate_random_maze()
+            # The player's generator goes on from where the maze left off, as when the maze was drawn from it
+            self.rng.bit_generator.state = self.maze_rng.bit_generator.state
 
         print("Maze created successfully...")
 
-        # Uncomment to save the maze in a json file
-        # data = {
-        #     "frequencies": self.map_frequencies.tolist(),
-        #     "start_pos": self.cur_pos.tolist(),
-        #     "end_pos": self.end_pos.tolist()
-        # }
-        # filename = 'data.json'
-        # with open(filename, 'w') as json_file:
-        #     json.dump(data, json_file, indent=4)
-        #
-        # print(f"JSON file '{filename}' created successfully.")
+        # Uncomment to save the maze, as JSON or in the binary format if the filename ends with .npy
+        # save_map("data.json", self.cur_pos, self.end_pos, self.map_frequencies)
+
+        # The door clock keeps the frequencies of dense maps as uint8
+        self.door_clock = DoorClock(self.map_frequencies)
+        self.map_frequencies = self.door_clock.frequencies
+        self._edge_schedule = None
+
+    def generate_random_maze(self):
+        # If no map is provided, generate a random maze using the seed provided, or reuse the maze generated
+        # from the same parameters by an earlier game when the map cache is enabled
+        cache_key = None
+        if self.map_cache is not None:
+            cache_key = self.map_cache.key(self.generator_version, self.seed, self.max_door_frequency,
+                                           self.config.dims, self.maze_rng.bit_generator.state, self.config.tile_size)
+            cached = self.map_cache.get(cache_key)
+            if cached is not None:
+                self.cur_pos, self.end_pos, self.map_frequencies, self.maze_repairs, rng_state = cached
+                self.start_pos = self.cur_pos.copy()
+                # Continue with the random numbers that generating the maze would have left behind
+                self.maze_rng.bit_generator.state = rng_state
+                self.logger.info("Loaded maze {} from the map cache".format(cache_key))
+                return
+
+        # Generate a frequency for each cell between 0 and max_door_frequency using the rng
+        while 1:
+            if self.config.tile_size:
+                # Huge mazes are streamed into a tile file a tile at a time, and only connected tiles are generated
+                if self.tile_dir is None:
+                    import tempfile
+                    self.tile_dir = tempfile.TemporaryDirectory(prefix="timing_maze_")
+                tile_path = os.path.join(self.tile_dir.name, "maze_{}.npy".format(len(os.listdir(self.tile_dir.name))))
+                self.cur_pos, self.end_pos, self.map_frequencies, self.maze_repairs = generate_tiled_maze(
+                    self.maze_rng, self.max_door_frequency, self.config.dims, tile_path, self.config.tile_size)
+            else:
+                self.cur_pos, self.end_pos, self.map_frequencies, self.maze_repairs = generate_maze(
+                    self.maze_rng, self.max_door_frequency, self.config.dims, version=self.generator_version)
+            self.start_pos = self.cur_pos.copy()
+            if self.maze_repairs:
+                self.logger.info("Opened {} passages to connect the maze".format(self.maze_repairs))
 
-        self.map_state = self.map_frequencies.copy()
+            if self.validate_maze():
+                break
 
-        if self.use_gui:
-            self.canvas = tk.Canvas(self.root, height=self.canvas_height, width=self.canvas_width, bg="#FCF1E3")
-            self.canvas.pack()
-            self.draw_grid()
-            self.root.mainloop()
-        else:
-            self.play_game()
+            print("Retrying to generate a valid maze...")
 
-    def validate_maze(self):
-        # Check the size of the map
-        if self.map_frequencies.shape != (constants.map_dim, constants.map_dim, 4):
-            print("Error with map size")
-            return False
-
-        # Check that all doors have a frequency between 0 and max_door_frequency
-        for i in range(constants.map_dim):
-            for j in range(constants.map_dim):
-                for k in range(4):
-                    if self.map_frequencies[i][j][k] < 0 or self.map_frequencies[i][j][k] > self.max_door_frequency:
-                        print("Error with frequency")
-                        return False
-
-        # Check that all boundary doors have n=0 in map_frequencies.
-        for i in range(constants.map_dim):
-            if self.map_frequencies[0][i][constants.LEFT] != 0:
-                print("Error with UP")
-                return False
-            if self.map_frequencies[constants.map_dim-1][i][constants.RIGHT] != 0:
-                print("Error with DOWN")
-                return False
-            if self.map_frequencies[i][0][constants.UP] != 0:
-                print("Error with LEFT")
-                return False
-            if self.map_frequencies[i][constants.map_dim-1][constants.DOWN] != 0:
-                print("Error with RIGHT")
-                return False
-
-        # Check that map has a valid start and end position.
-        if self.cur_pos[0] < 0 or self.cur_pos[0] >= constants.map_dim or self.cur_pos[1] < 0 or self.cur_pos[1] >= constants.map_dim:
-            print("Error with start")
-            return False
+        if cache_key is not None:
+            self.map_cache.put(cache_key, self.cur_pos, self.end_pos, self.map_frequencies, self.maze_repairs,
+                               self.maze_rng.bit_generator.state)
 
-        if self.end_pos[0] < 0 or self.end_pos[0] >= constants.map_dim or self.end_pos[1] < 0 or self.end_pos[1] >= constants.map_dim:
-            print("Error with end")
-            return False
+    def validate_maze(self):
+        # Returns a MazeValidation, which is truthy for a valid maze and otherwise describes the problem
+        result = validate_maze(self.map_frequencies, self.cur_pos, self.end_pos, self.max_door_frequency,
+                               self.config.dims)
+        if not result:
+            print(result.message)
+            self.logger.debug("Maze validation failed: {!r}".format(result))
+        return result
+
+    def reset(self, maze=None, seed=None):
+        """Start a new game to be driven turn by turn through step()
+
+            Args:
+                maze (str): path of the maze to load, a random maze is generated if not provided
+                seed (int): reseed the random number generators before generating the maze
+            Returns:
+                TimingMazeState: the percept for the first turn
+        """
+        if seed is not None:
+            # Reseed in place, the player holds a reference to the same generator
+            self.rng.bit_generator.state = np.random.default_rng(seed).bit_generator.state
+            self.maze_rng = np.random.default_rng(seed)
+            self.seed = seed
+        self.load_maze(maze)
 
-        # Check if all cells are reachable from one-another
-        # Create an undirected graph and check if the map is valid by looking for islands in the graph.
-
-        # Create a graph of the map with the doors as edges and a valid path if both doors are open at anytime.
-        graph = np.zeros((constants.map_dim, constants.map_dim, 4), dtype=int)
-
-        for i in range(constants.map_dim):
-            for j in range(constants.map_dim):
-                for k in range(4):
-                    if self.map_frequencies[i][j][k] != 0:
-                        if k == constants.LEFT:
-                            if i > 0 and self.map_frequencies[i-1][j][constants.RIGHT] != 0:
-                                graph[i][j][k] = 1
-                        elif k == constants.RIGHT:
-                            if i < constants.map_dim-1 and self.map_frequencies[i+1][j][constants.LEFT] != 0:
-                                graph[i][j][k] = 1
-                        elif k == constants.DOWN:
-                            if j < constants.map_dim-1 and self.map_frequencies[i][j+1][constants.UP] != 0:
-                                graph[i][j][k] = 1
-                        elif k == constants.UP:
-                            if j > 0 and self.map_frequencies[i][j-1][constants.DOWN] != 0:
-                                graph[i][j][k] = 1
-
-
-        # Create a visited array to keep track of visited cells
-        visited = np.zeros((constants.map_dim, constants.map_dim), dtype=int)
-
-        # Create a queue to perform BFS traversal
-        q = queue()
-        q.append((0, 0))
-        visited[0][0] = 1
-        visited_count = 0
-
-        # Perform BFS traversal
-        print("Validating reachability of all cells...")
-
-        while len(q) > 0:
-            cell = q.popleft()
-            row = cell[0]
-            col = cell[1]
-            visited_count += 1
-
-            # Check for all the four doors,
-            for door_type in range(4):
-                if graph[row][col][door_type] == 1:
-                    # Get the adjacent cell
-                    adj_x = row + self.dRow[door_type]
-                    adj_y = col + self.dCol[door_type]
-                    if 0 <= adj_x < constants.map_dim and  0 <= adj_y < constants.map_dim and visited[adj_x][adj_y] == 0:
-                        q.append((adj_x, adj_y))
-                        visited[adj_x][adj_y] = 1
-
-        return visited_count == constants.map_dim * constants.map_dim
-
-    def resume(self):
-        if self.game_state == "pause":
-            self.game_state = "resume"
-            self.game_speed = "normal"
-            self.root.after(50, self.play_game)
-
-    def pause(self):
-        if self.game_state != "over":
-            self.game_state = "pause"
-
-    def step(self):
-        if self.game_state != "over":
-            self.game_state = "pause"
-            self.root.after(100, self.play_game)
-
-    def toggle_speed(self):
-        if self.game_state == "resume":
-            if self.game_speed == "normal":
-                self.game_speed = "fast"
-            else:
-                self.game_speed = "normal"
+        self.turns = 0
+        self.valid_moves = 0
+        self.goal_reached = False
+        self.player_time = self.total_timeout
+        self.player_timeout = self.player is None
+        self.timeouts = [timeout for timeout in self.timeouts if timeout["kind"] == "init"]
+        self.game_state = "resume"
+        if self.timers is not None:
+            self.timers.clear()
+        self.start_time = time.time()
+        self.start_replay()
+        return self.begin_turn()
+
+    def step(self, action):
+        """Play the current turn with the given action
+
+            Args:
+                action (int): move for this turn, WAIT, LEFT, UP, RIGHT or DOWN
+            Returns:
+                Tuple[TimingMazeState, bool, dict]: the percept for the next turn (None once the game is over),
+                    whether the game is over and information on the turn just played
+        """
+        if self.door_clock is None:
+            raise Exception("No game in progress, call reset() first")
+        if self.game_state == "over":
+            raise Exception("Game is over, call reset to start a new game")
+
+        done = self.end_turn(action)
+        info = {
+            "turns": self.turns,
+            "cur_pos": self.cur_pos.copy(),
+            "move_accepted": self.move_accepted,
+            "valid_moves": self.valid_moves,
+            "goal_reached": self.goal_reached,
+        }
+        percept = None if done else self.begin_turn()
+        return percept, done, info
+
+    def fast_forward(self, move):
+        """Wait until move can be made and make it, skipping the turns in between
+
+        Plays like calling step(WAIT) until the move can be made and then step(move), without building the percepts
+        of the waited turns. If the turn limit comes first the game ends waiting.
+
+            Args:
+                move (int): move to make, LEFT, UP, RIGHT or DOWN
+            Returns:
+                Tuple[TimingMazeState, bool, dict]: as returned by step for the turn of the move
+        """
+        if self.door_clock is None:
+            raise Exception("No game in progress, call reset() first")
+        if self.game_state == "over":
+            raise Exception("Game is over, call reset to start a new game")
+
+        target = self.edge_schedule.next_crossable(self.cur_pos[0], self.cur_pos[1], move, self.turns)
+        if target is None:
+            raise ValueError("Move {} can never be made from {}".format(move, self.cur_pos))
+        if target > self.max_turns:
+            target, move = int(self.max_turns), constants.WAIT
+        if target > self.turns:
+            # The skipped turns are waits, which are always valid moves
+            self.valid_moves += target - self.turns
+            if self.replay is not None:
+                for _ in range(target - self.turns):
+                    self.replay.record(constants.WAIT, True, self.cur_pos)
+            self.turns = target - 1
+            self.begin_turn()
+        return self.step(move)
 
     def play_game(self):
+        # Headless games are played to the end here, the GUI schedules the turns instead
+        while not self.play_turn():
+            pass
+
+    def play_turn(self):
+        # Play one turn with the move of the player, returns True once the game is over
+        profiling = self.profiler is not None and self.profiler.start_turn(self.turns + 1)
+        before_state = self.begin_turn()
+        returned_action = self.get_player_move(before_state)
+        over = self.end_turn(returned_action)
+        if profiling:
+            self.profiler.end_turn()
+        if over and self.profiler is not None:
+            self.profile_summary = self.profiler.close()
+            self.profiler = None
+        return over
+
+    def begin_turn(self):
         self.turns += 1
+        timers = self.timers
+        if timers is not None:
+            timers.start()
 
         # Get the drone visual for a radius of r
 
-        drone_visual_time = time.time()
+        drone_visual_time = time.perf_counter()
         maze_state, is_end_visible = self.get_drone_visual()
-        drone_visual_time = time.time() - drone_visual_time
-        self.logger.debug("Drone visual took {:.3f}s".format(drone_visual_time))
+        self.drone_visual_time = time.perf_counter() - drone_visual_time
+        if timers is not None:
+            timers.lap("visibility")
 
         # Create the state object for the player
         before_state = TimingMazeState(maze_state, is_end_visible,
                                        self.end_pos[0]-self.cur_pos[0], self.end_pos[1]-self.cur_pos[1],
-                                       self.start_pos[0]-self.cur_pos[0], self.start_pos[1]-self.cur_pos[1])
+                                       self.start_pos[0]-self.cur_pos[0], self.start_pos[1]-self.cur_pos[1],
+                                       array_percept=self.array_percept, radius=self.radius,
+                                       map_dims=self.config.dims, turn=self.turns)
+        self.current_percept = before_state
+        if timers is not None:
+            timers.lap("percept")
+        return before_state
+
+    def get_player_move(self, before_state):
         returned_action = None
+        self.player_time_taken = 0.0
         if not self.player_timeout:
-            player_start = time.time()
+            if self.timers is not None:
+                self.timers.start()
+            budget, kind = self.move_budget()
+            is_timeout = False
+            player_start = time.perf_counter()
             try:
-                # Call the player's move function for turn on this move
-                returned_action = self.player.move(
-                    current_percept=before_state
-                )
+                # Call the player's move function for turn on this move, it is cancelled past its time limit
+                if self.player_host:
+                    returned_action = self.player.move(current_percept=before_state, timeout=budget)
+                elif budget is None:
+                    returned_action = self.player.move(current_percept=before_state)
+                else:
+                    returned_action = self.watchdog.call(budget, self.player.move, current_percept=before_state)
+            except TimeoutException:
+                is_timeout = True
+                returned_action = None
             except Exception as e:
                 print(f"Exception in player code: {e}")
                 returned_action = None
 
-            player_time_taken = time.time() - player_start
-            self.logger.debug("Player {} took {:.3f}s".format(self.player_name, player_time_taken))
-
-            self.player_time -= player_time_taken
+            self.player_time_taken = time.perf_counter() - player_start
+            if self.timers is not None:
+                self.timers.lap("player")
+            self.player_time -= self.player_time_taken
+            if is_timeout:
+                self.record_timeout(kind, budget, self.player_time_taken)
+                self.logger.error("Player %s ran out of its %s time limit of %.3fs on turn %d", self.player_name, kind,
+                                  budget, self.turns)
+                if kind == "total":
+                    self.player_timeout = True
+                elif self.player_host and self.player_time > 0:
+                    self.restart_player()
             if self.player_time <= 0:
                 self.player_timeout = True
                 returned_action = None
-
+        return returned_action
+
+    def restart_player(self):
+        # A hosted player is killed when it overruns the time limit of a move, it is started again in a new worker so
+        # that it only loses the move, like an in-process player. Starting it again counts towards its total time
+        start = time.perf_counter()
+        try:
+            self.player.restart(self.player_time)
+            self.logger.info("Restarted player %s after it was killed on turn %d", self.player_name, self.turns)
+        except (TimeoutException, RuntimeError) as e:
+            self.player_timeout = True
+            self.logger.error("Player %s could not be restarted: %r", self.player_name, e)
+        self.player_time -= time.perf_counter() - start
+
+    def move_budget(self):
+        # Seconds the player may take for the move of this turn and which time limit sets them, None without limits
+        if not self.use_timeout:
+            return None, None
+        if self.turn_timeout is not None and self.turn_timeout < self.player_time:
+            return self.turn_timeout, "turn"
+        return max(self.player_time, 0), "total"
+
+    def record_timeout(self, kind, budget, elapsed):
+        """Record that the player ran out of a time limit, the timeouts are part of the result of the game
+
+            Args:
+                kind (str): "init" for the initialization of the player, "turn" for a move that took longer than the
+                    time limit of a move and "total" once all the time of the player is spent
+                budget (float): time limit in seconds
+                elapsed (float): seconds the player took
+        """
+        self.timeouts.append({"turn": self.turns, "kind": kind, "budget": budget, "elapsed": elapsed})
+
+    def end_turn(self, returned_action):
+        # Apply the move for the current turn, returns True once the game is over
+        self.move_accepted = False
+        timers = self.timers
+        if timers is not None:
+            timers.start()
         if self.check_action(returned_action):
             move = returned_action
             if self.check_and_apply_move(move):
-                print("Move Accepted! New position", self.cur_pos)
-                self.logger.debug("Received move from {}".format(self.player_name))
                 self.valid_moves += 1
+                self.move_accepted = True
             else:
-                print("Invalid move as trying to cross some uncrossable boundaries hence cancelled: ", move,
-                      self.cur_pos[0], self.cur_pos[1], self.end_pos[0], self.end_pos[1])
-                self.logger.info("Invalid move from {} as it does not follow the rules".format(self.player_name))
+                self.logger.info("Invalid move from %s as it does not follow the rules", self.player_name)
         else:
-            print("Invalid move")
-            self.logger.info("Invalid move from {} as it doesn't follow the return format".format(self.player_name))
-
-        if self.use_gui:
-            self.draw_grid()
-
-        self.update_door_state()
-
-
-        print("Turn {} complete".format(self.turns))
+            self.logger.info("Invalid move from %s as it doesn't follow the return format", self.player_name)
+        if timers is not None:
+            timers.lap("move_check")
+
+        if self.replay is not None:
+            self.replay.record(returned_action, self.move_accepted, self.cur_pos)
+        if self.logger.isEnabledFor(TURN):
+            self.logger.log(TURN, TURN_MESSAGE, turn_record(self.turns, returned_action, self.move_accepted,
+                                                            self.cur_pos, self.drone_visual_time,
+                                                            self.player_time_taken))
+        if timers is not None:
+            timers.lap("replay")
+        # The GUI times its own drawing as the render phase
+        if self.gui is not None:
+            self.gui.turn_played()
 
         if self.cur_pos[0] == self.end_pos[0] and self.cur_pos[1] == self.end_pos[1]:
             self.game_state = "over"
+            self.end_replay()
+            self.flush_logs()
+            self.goal_reached = True
             print("Goal reached!\n\n Turns taken: {}\n".format(self.turns))
             self.end_time = time.time()
             print("\nTime taken: {}\nValid moves: {}\n".format(self.end_time - self.start_time, self.valid_moves))
-            return
-
-        if self.turns < self.max_turns:
-            if self.use_gui:
-                if self.game_state == "resume":
-                    if self.game_speed == "normal":
-                        self.root.after(200, self.play_game)
-                    else:
-                        self.root.after(5, self.play_game)
-            else:
-                self.play_game()
-        else:
+            return True
+
+        if self.turns >= self.max_turns:
             print("Goal not reached...\n\n")
             self.game_state = "over"
+            self.end_replay()
+            self.flush_logs()
             self.end_time = time.time()
             print("\nTime taken: {}\nValid moves: {}\n".format(self.end_time - self.start_time, self.valid_moves))
-            return
-
-    @staticmethod
-    def is_valid(row, col, vis):
-        # If cell lies out of bounds
-        if row < 0 or col < 0 or row >= constants.map_dim or col >= constants.map_dim:
-            return False
-
-        # If cell is already visited
-        if vis[row][col]:
-            return False
-
-        # Otherwise
-        return True
-
-    @staticmethod
-    def get_euclidean_distance_between_two_points(x1, y1, x2, y2):
-        return math.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2)
-
-    def update_door_state(self):
-        # Iterate all the doors and update their states
-        for i in range(constants.map_dim):
-            for j in range(constants.map_dim):
-                for k in range(4):
-                    if self.map_state[i][j][k] > 0:
-                        if self.map_state[i][j][k] == 1:
-                            self.map_state[i][j][k] = self.map_frequencies[i][j][k]
-                        else:
-                            self.map_state[i][j][k] -= 1
-
-    def validate_distance_between_drone_and_door(self, row, col, door_type):
-        # calculate the distance between the drone and three points of the door,
-        # centre and the two ends of the door. If any of these points are visible from the drone,
-        # then the door is visible from the drone
-        drone_x = self.cur_pos[0]+0.5
-        drone_y = self.cur_pos[1]+0.5
-        distance = 0
-
-        if door_type == constants.LEFT:
-            # calculate the distance between the drone and the centre of the door
-            door_x = row
-            door_y = col + 0.5
-            distance = self.get_euclidean_distance_between_two_points(drone_x, drone_y, door_x, door_y)
-
-            # calculate the distance between the drone and the bottom end of the door
-            door_x = row
-            door_y = col + 1
-            distance = min(distance,
-                self.get_euclidean_distance_between_two_points(drone_x, drone_y, door_x, door_y))
-
-            # calculate the distance between the drone and the top end of the door
-            door_x = row
-            door_y = col
-            distance = min(distance,
-                self.get_euclidean_distance_between_two_points(drone_x, drone_y, door_x, door_y))
-
-        elif door_type == constants.RIGHT:
-            # calculate the distance between the drone and the centre of the door
-            door_x = row + 1
-            door_y = col + 0.5
-            distance = self.get_euclidean_distance_between_two_points(drone_x, drone_y, door_x, door_y)
-
-            # calculate the distance between the drone and the bottom end of the door
-            door_x = row + 1
-            door_y = col + 1
-            distance = min(distance,
-                           self.get_euclidean_distance_between_two_points(drone_x, drone_y, door_x, door_y))
-
-            # calculate the distance between the drone and the top end of the door
-            door_x = row + 1
-            door_y = col
-            distance = min(distance,
-                           self.get_euclidean_distance_between_two_points(drone_x, drone_y, door_x, door_y))
-
-        elif door_type == constants.UP:
-            # calculate the distance between the drone and the centre of the door
-            door_x = row + 0.5
-            door_y = col
-            distance = self.get_euclidean_distance_between_two_points(drone_x, drone_y, door_x, door_y)
-
-            # calculate the distance between the drone and the left end of the door
-            door_x = row
-            door_y = col
-            distance = min(distance,
-                           self.get_euclidean_distance_between_two_points(drone_x, drone_y, door_x, door_y))
-
-            # calculate the distance between the drone and the right end of the door
-            door_x = row + 1
-            door_y = col
-            distance = min(distance,
-                           self.get_euclidean_distance_between_two_points(drone_x, drone_y, door_x, door_y))
-        elif door_type == constants.DOWN:
-            # calculate the distance between the drone and the centre of the door
-            door_x = row + 0.5
-            door_y = col + 1
-            distance = self.get_euclidean_distance_between_two_points(drone_x, drone_y, door_x, door_y)
-
-            # calculate the distance between the drone and the left end of the door
-            door_x = row
-            door_y = col + 1
-            distance = min(distance,
-                           self.get_euclidean_distance_between_two_points(drone_x, drone_y, door_x, door_y))
-
-            # calculate the distance between the drone and the right end of the door
-            door_x = row + 1
-            door_y = col + 1
-            distance = min(distance,
-                           self.get_euclidean_distance_between_two_points(drone_x, drone_y, door_x, door_y))
-        return distance <= self.radius
-
-    # Function to perform the BFS traversal
-    # Adapted from https://www.geeksforgeeks.org/breadth-first-traversal-bfs-on-a-2d-array/
-    def BFS(self, state):
-
-        # Stores indices of the matrix cells
-        q = queue()
-        vis = [[False for _ in range(constants.map_dim)] for _ in range(constants.map_dim)]
-        is_end_visible = False
-
-        # Mark the starting cell as visited
-        # and push it into the queue
-        q.append((self.cur_pos[0], self.cur_pos[1]))
-        vis[self.cur_pos[0]][self.cur_pos[1]] = True
-
-        if self.cur_pos[0] == self.end_pos[0] and self.cur_pos[1] == self.end_pos[1]:
-            is_end_visible = True
-
-        # Iterate while the queue
-        # is not empty
-        while len(q) > 0:
-            cell = q.popleft()
-            row = cell[0]
-            col = cell[1]
-            any_part_visible = False
-
-            # Check for all the four doors,
-            for door_type in range(4):
-                # Get the distance of door from middle of current cell
-                # If the distance is less than or equal to r then the door is a part of the drone visual
-                # Otherwise it is not
-                if not self.validate_distance_between_drone_and_door(row, col, door_type):
-                    continue
-
-                any_part_visible = True
-
-                # if door is a part of the drone visual
-                # add to state whether they are open, closed or at boundary
-                if row == 0 and door_type == constants.UP:
-                    state.append((row-self.cur_pos[0], col-self.cur_pos[1], door_type, constants.BOUNDARY))
-                elif row == constants.map_dim-1 and door_type == constants.DOWN:
-                    state.append((row-self.cur_pos[0], col-self.cur_pos[1], door_type, constants.BOUNDARY))
-                elif col == 0 and door_type == constants.LEFT:
-                    state.append((row-self.cur_pos[0], col-self.cur_pos[1], door_type, constants.BOUNDARY))
-                elif col == constants.map_dim-1 and door_type == constants.RIGHT:
-                    state.append((row-self.cur_pos[0], col-self.cur_pos[1], door_type, constants.BOUNDARY))
-                elif self.map_state[row][col][door_type] == 1:
-                    state.append((row-self.cur_pos[0], col-self.cur_pos[1], door_type, constants.OPEN))
-                else:
-                    state.append((row-self.cur_pos[0], col-self.cur_pos[1], door_type, constants.CLOSED))
-
-            # Go to the adjacent cells if any part is visible
-            if not any_part_visible:
-                continue
-
-            # Check if this is end point
-            if row == self.end_pos[0] and col == self.end_pos[1]:
-                is_end_visible = True
-
-            for i in range(4):
-                adj_x = row + self.dRow[i]
-                adj_y = col + self.dCol[i]
-                if self.is_valid(adj_x, adj_y, vis):
-                    q.append((adj_x, adj_y))
-                    vis[adj_x][adj_y] = True
+            return True
 
-        return is_end_visible
+        return False
 
     def get_drone_visual(self):
-        # use breadth first search to traverse all the cells in a radius of r of the current position
-        # and get the information on cell boundaries for each of the cells if they are open or closed
-        # write code here
-        # create an empty state to store the information on the cell boundaries
-        state = []
-        is_end_visible = self.BFS(state)
-
-        return state, is_end_visible
+        # Gather the doors in a radius of r of the current position from the precomputed visibility stencil,
+        # along with whether they are open, closed or at boundary. Only the doors around the drone are read.
+        x0, x1, y0, y1 = visible_window(self.cur_pos, self.config.dims, self.radius)
+        open_bits = self.door_clock.open_bits(self.turns, x0, x1, y0, y1)
+        if self.timers is not None:
+            self.timers.lap("doors")
+        return drone_visual(open_bits, self.cur_pos, self.end_pos, self.radius, (x0, y0), self.config.dims)
 
     # Verify the action returned by the player
     def check_action(self, action):
         if action is None:
-            print("No action returned")
+            self.logger.debug("No action returned")
             return False
         if type(action) is not int:
-            print("Invalid action type")
+            self.logger.debug("Invalid action type")
             return False
         if action < -1 or action > 3:
-            print("Invalid action value")
+            self.logger.debug("Invalid action value")
             return False
         return True
 
     # Validate if the move is possible by checking if move will cross
     # grid boundary or the doors are closed
     def check_and_apply_move(self, move):
+        is_open = self.door_clock.is_open
+        turn = self.turns
+        map_width, map_height = self.config.dims
         cur_y = self.cur_pos[1]
         cur_x = self.cur_pos[0]
         if move == constants.LEFT:
-            if (cur_x != 0 and self.map_state[cur_x][cur_y][constants.LEFT] == 1
-                    and self.map_state[cur_x-1][cur_y][constants.RIGHT] == 1):
+            if (cur_x != 0 and is_open(cur_x, cur_y, constants.LEFT, turn)
+                    and is_open(cur_x-1, cur_y, constants.RIGHT, turn)):
                 self.cur_pos[0] -= 1
                 return True
         elif move == constants.UP:
-            if (cur_y != 0 and self.map_state[cur_x][cur_y][constants.UP] == 1
-                    and self.map_state[cur_x][cur_y-1][constants.DOWN] == 1):
+            if (cur_y != 0 and is_open(cur_x, cur_y, constants.UP, turn)
+                    and is_open(cur_x, cur_y-1, constants.DOWN, turn)):
                 self.cur_pos[1] -= 1
                 return True
         elif move == constants.RIGHT:
-            if (cur_x != constants.map_dim - 1 and self.map_state[cur_x][cur_y][constants.RIGHT] == 1
-                    and self.map_state[cur_x+1][cur_y][constants.LEFT] == 1):
+            if (cur_x != map_width - 1 and is_open(cur_x, cur_y, constants.RIGHT, turn)
+                    and is_open(cur_x+1, cur_y, constants.LEFT, turn)):
                 self.cur_pos[0] += 1
                 return True
         elif move == constants.DOWN:
-            if (cur_y != constants.map_dim - 1 and self.map_state[cur_x][cur_y][constants.DOWN] == 1
-                    and self.map_state[cur_x][cur_y+1][constants.UP] == 1):
+            if (cur_y != map_height - 1 and is_open(cur_x, cur_y, constants.DOWN, turn)
+                    and is_open(cur_x, cur_y+1, constants.UP, turn)):
                 self.cur_pos[1] += 1
                 return True
         elif move == constants.WAIT:
             return True
         return False
 
+    @property
+    def map_state(self):
+        # Door countdowns on the current turn, derived from the door clock instead of being stored
+        return self.door_clock.state(max(self.turns, 1))
+
+    @property
+    def edge_schedule(self):
+        # Per-edge crossing periods, built on first use since only fast_forward reads them
+        if self._edge_schedule is None:
+            self._edge_schedule = EdgeSchedule(self.map_frequencies)
+        return self._edge_schedule
+
+    def replay_header(self):
+        # Everything needed to rebuild the maze of the game, see replay_log.py
+        from replay_log import maze_checksum
+        return {
+            "player": self.player_name,
+            "seed": self.seed,
+            "max_door_frequency": self.max_door_frequency,
+            "radius": self.radius,
+            "dims": list(self.config.dims),
+            "generator_version": self.generator_version,
+            "tile_size": self.config.tile_size,
+            "maze": os.path.abspath(self.maze_path) if self.maze_path else None,
+            "rng_state": self.maze_rng_state,
+            "map_checksum": maze_checksum(self.map_frequencies),
+            "start_pos": self.start_pos.tolist(),
+            "end_pos": self.end_pos.tolist(),
+        }
+
+    def start_replay(self):
+        # Record the game turn by turn when a replay file was asked for
+        self.end_replay()
+        if self.replay_path:
+            # Only imported for games that are recorded
+            from replay_log import ReplayWriter
+            self.replay = ReplayWriter(self.replay_path, self.replay_header())
+
+    def end_replay(self):
+        if self.replay is not None:
+            self.replay.close()
+            self.replay = None
+
+    def close(self):
+        # Stop the worker process of a hosted player, the game can no longer be played afterwards
+        if self.player_host and self.player is not None:
+            self.player.close()
+
+    def flush_logs(self):
+        # Wait for the writer thread to catch up, so the logs are complete once the game is over
+        if self.logs is not None:
+            self.logs.flush()
+
     def get_state(self):
         return_dict = dict()
         return_dict['map_state'] = self.map_state
         return_dict['cur_pos'] = self.cur_pos
         return return_dict
-
-    def draw_grid(self):
-        self.canvas.delete("all")  # Clear the canvas
-
-        for i in range(constants.map_dim):
-            for j in range(constants.map_dim):
-                x1, y1 = self.x_offset + i * constants.CELL_SIZE, self.y_offset + j * constants.CELL_SIZE
-                x2, y2 = x1 + constants.CELL_SIZE, y1 + constants.CELL_SIZE
-
-                # Draw the cell's doors based on door_states
-                if self.map_state[i][j][constants.UP] != 1:  # Top door
-                    self.canvas.create_line(x1, y1+0.5, x2, y1+0.5, fill="blue", width = 0.5)
-                if self.map_state[i][j][constants.RIGHT] != 1:  # Right door
-                    self.canvas.create_line(x2-0.5, y1, x2-0.5, y2, fill="blue", width = 0.5)
-                if self.map_state[i][j][constants.DOWN] != 1:  # Bottom door
-                    self.canvas.create_line(x1, y2-0.5, x2, y2-0.5, fill="red", width = 0.5)
-                if self.map_state[i][j][constants.LEFT] != 1:  # Left door
-                    self.canvas.create_line(x1+0.5, y1, x1+0.5, y2, fill="red", width = 0.5)
-
-        # Mark the start, cur, and end positions
-        self.mark_position(self.start_pos, "green")
-        self.mark_position(self.cur_pos, "orange", True)
-        self.mark_position(self.end_pos, "red")
-        self.create_buttons()
-        self.canvas.create_text(650, 20, text="Turns: {}".format(self.turns), font=("Arial", 14), fill="black",
-                                                  activefill="gray", tags="turns text")
-        self.canvas.create_text(750, 20, text="Start Pos: {}".format(self.start_pos), font=("Arial", 14), fill="black",
-                                activefill="gray", tags="turns text")
-        self.canvas.create_text(900, 20, text="End Pos: {}".format(self.end_pos), font=("Arial", 14), fill="black",
-                                activefill="gray", tags="turns text")
-        self.canvas.create_text(1050, 20, text="Cur Pos: {}".format(self.cur_pos), font=("Arial", 14), fill="black",
-                                activefill="gray", tags="turns text")
-
-    def create_buttons(self):
-        # Create text-based "Pause" button on the canvas
-        self.pause_btn = self.canvas.create_text(250, 20, text="Pause", font=("Arial", 14), fill="black",
-                                                 activefill="gray", tags="pause_button")
-        self.canvas.tag_bind("pause_button", "<Button-1>", lambda e: self.pause())
-
-        # Create a text-based "Reset" button on the canvas
-        self.resume_btn = self.canvas.create_text(350, 20, text="Start/Resume", font=("Arial", 14), fill="black",
-                                                  activefill="gray", tags="resume_button")
-        self.canvas.tag_bind("resume_button", "<Button-1>", lambda e: self.resume())
-
-        self.resume_btn = self.canvas.create_text(450, 20, text="1X/4X", font=("Arial", 14), fill="black",
-                                                  activefill="gray", tags="speed_button")
-        self.canvas.tag_bind("speed_button", "<Button-1>", lambda e: self.toggle_speed())
-
-        self.step_btn = self.canvas.create_text(550, 20, text="Step", font=("Arial", 14), fill="black",
-                                                  activefill="gray", tags="step_button")
-        self.canvas.tag_bind("step_button", "<Button-1>", lambda e: self.step())
-
-    def mark_position(self, pos, color, withCircle = False):
-        x, y = pos
-
-        x1, y1 = self.x_offset + x * constants.CELL_SIZE + 2, self.y_offset + y * constants.CELL_SIZE + 2
-        x2, y2 = x1+5, y1+5
-        self.canvas.create_rectangle(x1, y1, x2, y2, fill=color)
-
-        if withCircle:
-            cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
-            r = self.radius*constants.CELL_SIZE
-            self.canvas.create_oval(cx - r, cy - r, cx + r, cy + r, fill="", outline="blue", width=1)
@@ -1,13 +1,39 @@
+import math
+import numpy as np
+import constants
+
+
 class TimingMazeState:
-    def __init__(self, maze_state, is_end_visible, end_x, end_y, start_x, start_y):
+    # Offset of the neighbouring cell for each move, indexed by LEFT, UP, RIGHT, DOWN
+    move_offsets = ((-1, 0), (0, -1), (1, 0), (0, 1))
+
+    def __init__(self, maze_state, is_end_visible, end_x, end_y, start_x, start_y, array_percept=False, radius=None,
+                 map_dims=(constants.map_dim, constants.map_dim), turn=None):
         """
             Args:
-                maze_state (List[List[int]]): 2D list of integers representing the maze state
+                maze_state (np.ndarray): int16 (n, 4) array of the visible doors, one (dx, dy, door_type, door_state)
+                    row per door relative to the current position, a list of 4-tuples is also accepted
                 is_end_visible (bool): Boolean representing if the end is visible
                 end_x (int): x-coordinate of the end cell
                 end_y (int): y-coordinate of the end cell
+                array_percept (bool): expose maze_state as the array itself instead of a list of tuples
+                radius (int): radius of the drone, sizes the dense window, inferred from maze_state if not given
+                map_dims (Tuple[int, int]): (width, height) of the maze
+                turn (int): turn of the game the doors are shown for, the first turn is 1
         """
-        self.maze_state = maze_state
+        if isinstance(maze_state, np.ndarray):
+            self.maze_array = maze_state
+            self._maze_list = None
+        else:
+            self.maze_array = np.array(maze_state, dtype=np.int16).reshape(-1, 4)
+            self._maze_list = maze_state
+        self.array_percept = array_percept
+        if radius is None:
+            radius = int(np.abs(self.maze_array[:, :2]).max(initial=0))
+        self.radius = radius
+        self.map_dims = tuple(map_dims)
+        self.turn = turn
+        self._window = None
         self.start_x = start_x
         self.start_y = start_y
         self.is_end_visible = is_end_visible
@@ -15,3 +41,82 @@ class TimingMazeState:
             self.end_x = end_x
             self.end_y = end_y
 
+    @property
+    def maze_state(self):
+        # Players that did not opt into the array percept get a list of tuples, built on first access only
+        if self.array_percept:
+            return self.maze_array
+        if self._maze_list is None:
+            self._maze_list = list(map(tuple, self.maze_array.tolist()))
+        return self._maze_list
+
+    @property
+    def window(self):
+        """Dense int8 (2r+1, 2r+1, 4) array of door states centred on the drone
+
+        Entry [dx + r][dy + r][door_type] is the state of that door of the cell at offset (dx, dy): UNKNOWN for doors
+        outside the drone's view, otherwise CLOSED, OPEN or BOUNDARY. Built on first access only.
+        """
+        if self._window is None:
+            size = 2 * self.radius + 1
+            self._window = np.full((size, size, 4), constants.UNKNOWN, dtype=np.int8)
+            maze_array = self.maze_array
+            self._window[maze_array[:, 0] + self.radius, maze_array[:, 1] + self.radius,
+                         maze_array[:, 2]] = maze_array[:, 3]
+        return self._window
+
+    def door(self, dx, dy, door_type):
+        """Return the state of a door of the cell at offset (dx, dy), UNKNOWN if it is not visible"""
+        if abs(dx) > self.radius or abs(dy) > self.radius:
+            return constants.UNKNOWN
+        return int(self.window[dx + self.radius, dy + self.radius, door_type])
+
+    def crossable(self, move):
+        """Return True if the move can be made this turn, i.e. both doors between the two cells are open"""
+        if move == constants.WAIT:
+            return True
+        dx, dy = self.move_offsets[move]
+        return (self.door(0, 0, move) == constants.OPEN
+                and self.door(dx, dy, (move + 2) % 4) == constants.OPEN)
+
+    def next_crossable(self, move, frequencies):
+        """Return the first turn, from the turn of this percept on, on which move can be made
+
+        The percept only shows the doors of this turn: an edge whose doors are both open is crossable now and one with
+        a boundary door never is. Otherwise the answer comes from frequencies, the player's own estimates of the door
+        frequencies, the engine keeps the actual frequencies hidden. The doors of the edge are open together on the
+        multiples of the lcm of their frequencies.
+
+        The estimates are kept relative to the start position, where the drone is at (-start_x, -start_y), so they
+        stay valid as the drone moves. For example, a player that records the doors it sees open at a turn:
+
+            x, y = -current_percept.start_x, -current_percept.start_y
+            for dx, dy, door_type, door_state in current_percept.maze_array.tolist():
+                if door_state == constants.OPEN:
+                    cell = self.frequencies.setdefault((x + dx, y + dy), [None] * 4)
+                    cell[door_type] = math.gcd(cell[door_type] or 0, current_percept.turn)
+            turn = current_percept.next_crossable(constants.RIGHT, self.frequencies)
+
+            Args:
+                move (int): WAIT, LEFT, UP, RIGHT or DOWN
+                frequencies (Mapping[Tuple[int, int], Sequence[int]]): estimated frequencies of the four doors of a
+                    cell, indexed by door type, keyed by the position (x, y) of the cell relative to the start position.
+                    A cell may be missing and a door None when its frequency is not known
+            Returns:
+                int: the turn, None if the edge can never be crossed or the frequency of one of its doors is not known
+        """
+        if self.crossable(move):
+            return self.turn
+        dx, dy = self.move_offsets[move]
+        if constants.BOUNDARY in (self.door(0, 0, move), self.door(dx, dy, (move + 2) % 4)):
+            return None
+        x, y = -self.start_x, -self.start_y
+        doors = frequencies.get((x, y)), frequencies.get((x + dx, y + dy))
+        if doors[0] is None or doors[1] is None:
+            return None
+        frequency, opposite = doors[0][move], doors[1][(move + 2) % 4]
+        if not frequency or not opposite:
+            return None
+        # The doors are not both open on this turn, the edge is crossed on a later multiple of its period
+        period = math.lcm(int(frequency), int(opposite))
+        return (self.turn // period + 1) * period
@@ -0,0 +1,67 @@
+"""Per-phase timers of the turn loop, aggregated into latency percentiles per game.
+
+The engines time each phase of a turn with perf_counter_ns when they are given a TurnTimers, and only test that it is
+not None otherwise. A turn is timed as a series of laps: start() marks the beginning of a stretch of the turn and each
+lap(phase) charges the time since the previous mark to the phase, so consecutive phases cost one clock read each.
+"""
+from array import array
+from time import perf_counter_ns
+import numpy as np
+
+# Phases of a turn, in the order they are played
+#   doors: open doors around the drone from the door clock
+#   visibility: doors visible from the drone
+#   percept: TimingMazeState for the player
+#   player: move of the player
+#   move_check: validating and applying the move
+#   replay: recording the turn in the replay and the turn log
+#   render: drawing the turn in the GUI
+PHASES = ("doors", "visibility", "percept", "player", "move_check", "replay", "render")
+PERCENTILES = (50, 95, 99)
+
+
+class TurnTimers:
+    """Durations of every phase of the turns of a game, in ns"""
+
+    def __init__(self, phases=PHASES):
+        self.phases = phases
+        self.samples = {phase: array("q") for phase in phases}
+        self.last = 0
+
+    def start(self):
+        self.last = perf_counter_ns()
+
+    def lap(self, phase):
+        now = perf_counter_ns()
+        self.samples[phase].append(now - self.last)
+        self.last = now
+
+    def clear(self):
+        for samples in self.samples.values():
+            del samples[:]
+
+    def histograms(self):
+        """Return the count, total, p50, p95, p99 and max of every phase that was timed, in microseconds"""
+        histograms = {}
+        for phase in self.phases:
+            samples = self.samples[phase]
+            if not samples:
+                continue
+            us = np.frombuffer(samples, dtype=np.int64) / 1e3
+            histogram = {"count": int(us.size), "total": float(us.sum())}
+            for percentile, value in zip(PERCENTILES, np.percentile(us, PERCENTILES)):
+                histogram["p{}".format(percentile)] = float(value)
+            histogram["max"] = float(us.max())
+            histograms[phase] = histogram
+        return histograms
+
+
+def format_histograms(histograms):
+    """Return the histograms as a table, one line per phase"""
+    lines = ["{:>12} {:>8} {:>12} {:>10} {:>10} {:>10} {:>10}".format("phase (us)", "count", "total", "p50", "p95",
+                                                                      "p99", "max")]
+    for phase, histogram in histograms.items():
+        lines.append("{:>12} {:>8} {:>12.0f} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f}".format(
+            phase, histogram["count"], histogram["total"], histogram["p50"], histogram["p95"], histogram["p99"],
+            histogram["max"]))
+    return "\n".join(lines)
@@ -24,10 +24,6 @@ class TimeoutException(Exception):   # Custom exception class
     pass
 
 
-def timeout_handler(signum, frame):   # Custom signal handler
-    raise TimeoutException
-
-
 class MainLoggingFilter(logging.Filter):
     def __init__(self, name: str) -> None:
         super().__init__(name=name)